@@ -1,6 +1,44 @@
 """Python API for the Genesis platform"""
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-from .genesis import Genesis
-from .project import GenProject
-from .data import GenData
+import importlib
+import sys
+
+# Public names by module. They are imported on first access, so that tools
+# like the command line interface start without loading the HTTP stack.
+_EXPORTS = {
+    'Genesis': 'genesis',
+    'GenProject': 'project',
+    'GenData': 'data',
+    'GenStore': 'store',
+    'GenRemoteFile': 'remote',
+    'GenUploadIndex': 'uploads',
+    'GenRateLimiter': 'ratelimit',
+    'LoggingProgress': 'progress',
+    'Progress': 'progress',
+    'SilentProgress': 'progress',
+    'TerminalProgress': 'progress',
+    'OfflineGenesis': 'snapshot',
+    'GenSession': 'session',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ is not supported, import everything eagerly
+    for _name in _EXPORTS:
+        __getattr__(_name)
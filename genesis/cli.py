@@ -0,0 +1,272 @@
+"""Command line interface"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import time
+
+_START = time.time()
+
+# pylint: disable=wrong-import-position
+import argparse
+import os
+import sys
+
+
+PIPE = '+'
+
+DESCRIPTION = """Command line interface for the Genesis platform.
+
+Several commands can be chained with "{pipe}"; they share one signed-in
+session. Data object ids produced by a command (e.g. upload or query) are
+passed to the next command when it is not given ids (e.g. download or wait).
+""".format(pipe=PIPE)
+
+EPILOG = """example:
+  genesis -e me@example.com upload PROJECT -r reads.fastq.gz {pipe} wait {pipe} query
+""".format(pipe=PIPE)
+
+
+def _filters(values):
+    """Parse FIELD=VALUE command line arguments."""
+    query = {}
+    for value in values:
+        if '=' not in value:
+            raise ValueError("Filter {} is not in FIELD=VALUE format".format(value))
+        key, val = value.split('=', 1)
+        query[key] = val
+    return query
+
+
+def _upload_reads(gen, project, args):
+    """Upload single or paired-end reads and return the created data id."""
+    if args.r:
+        response = gen.upload(project, 'import:upload:reads-fastq', src=args.r)
+    else:
+        response = gen.upload(project, 'import:upload:reads-fastq-paired-end', src1=args.r1, src2=args.r2)
+
+    if response.status_code not in (200, 201):
+        raise RuntimeError("Upload failed (error {}): {}".format(response.status_code, response.text))
+
+    return gen._created_id(response)  # pylint: disable=protected-access
+
+
+def cmd_upload(gen, args, context):
+    if not (args.r or (args.r1 and args.r2)) or (args.r and (args.r1 or args.r2)):
+        raise ValueError("Define either -r or -r1 and -r2")
+
+    project_id = gen._project_id(args.project)  # pylint: disable=protected-access
+    data_id = _upload_reads(gen, project_id, args)
+    if data_id:
+        print(data_id)
+    context['ids'] = [data_id] if data_id else []
+
+
+def cmd_batch_upload(gen, args, context):
+    if not (args.r or (args.r1 and args.r2)) or (args.r and (args.r1 or args.r2)):
+        raise ValueError("Define either -r or -r1 and -r2")
+
+    if not args.r and len(args.r1) != len(args.r2):
+        raise ValueError("-r1 and -r2 file list length must match")
+
+    if args.r:
+        batch = [argparse.Namespace(r=r, r1=None, r2=None) for r in args.r]
+    else:
+        batch = [argparse.Namespace(r=None, r1=r1, r2=r2) for r1, r2 in zip(args.r1, args.r2)]
+
+    project_id = gen._project_id(args.project)  # pylint: disable=protected-access
+    context['ids'] = []
+    for reads in batch:
+        data_id = _upload_reads(gen, project_id, reads)
+        if data_id:
+            print(data_id)
+            context['ids'].append(data_id)
+
+
+def cmd_create(gen, args, context):
+    response = gen.create(sys.stdin.read(), args.resource)
+    if response.status_code not in (200, 201):
+        raise RuntimeError("Create failed (error {}): {}".format(response.status_code, response.text))
+
+    data_id = gen._created_id(response)  # pylint: disable=protected-access
+    if data_id:
+        print(data_id)
+    context['ids'] = [data_id] if data_id and args.resource == 'data' else []
+
+
+def cmd_query(gen, args, context):
+    query = _filters(args.filters)
+    if args.project:
+        data = gen.project_data(args.project)
+        if query:
+            project_id = gen._project_id(args.project)  # pylint: disable=protected-access
+            ids = gen._query_ids(case_ids__contains=project_id, **query)  # pylint: disable=protected-access
+            data = [d for d in data if d.id in ids]
+    else:
+        data = gen.data(**query)
+
+    for d in data:
+        print('\t'.join([d.id, d.status or '', d.type or '', d.name]))
+    context['ids'] = [d.id for d in data]
+
+
+def cmd_export(gen, args, context):
+    query = _filters(args.filters)
+    if args.project:
+        query['case_ids__contains'] = gen._project_id(args.project)  # pylint: disable=protected-access
+
+    count = gen.export(args.path, fmt=args.format, columns=args.columns, **query)
+    print("Exported {} data objects to {}".format(count, args.path), file=sys.stderr)
+
+
+def cmd_download(gen, args, context):
+    ids = args.ids or context.get('ids')
+    if not ids:
+        raise ValueError("No data objects to download")
+
+    if not os.path.isdir(args.directory):
+        os.makedirs(args.directory)
+
+    for path in gen.download_files(ids, args.field, args.directory):
+        print(path)
+
+
+def cmd_wait(gen, args, context):
+    ids = args.ids or context.get('ids')
+    if not ids:
+        raise ValueError("No data objects to wait for")
+
+    for d in gen.wait(ids, timeout=args.timeout):
+        print('\t'.join([d.id, d.status]))
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='genesis', description=DESCRIPTION, epilog=EPILOG,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-a', '--address', default=os.environ.get('GENESIS_URL'),
+                        help='Genesis url (default: $GENESIS_URL or the public server)')
+    parser.add_argument('-e', '--email', default=os.environ.get('GENESIS_EMAIL'),
+                        help='Sign-in e-mail (default: $GENESIS_EMAIL or anonymous)')
+    parser.add_argument('-p', '--password', default=os.environ.get('GENESIS_PASSWORD'),
+                        help='Sign-in password (default: $GENESIS_PASSWORD or anonymous)')
+    parser.add_argument('--timing', action='store_true', help='Print startup and command times to stderr')
+    parser.add_argument('--max-requests', type=float, metavar='N', help='Limit requests per second')
+    parser.add_argument('--max-bytes', type=float, metavar='N', help='Limit uploaded and downloaded bytes per second')
+    parser.add_argument('--rate-limit-file', default=os.environ.get('GENESIS_RATE_LIMIT_FILE'), metavar='PATH',
+                        help='Share rate limits with other processes through this file '
+                             '(default: $GENESIS_RATE_LIMIT_FILE)')
+    parser.add_argument('--http-cache', default=os.environ.get('GENESIS_HTTP_CACHE'), metavar='DIR',
+                        help='Keep API responses in this directory and revalidate them in later calls '
+                             '(default: $GENESIS_HTTP_CACHE)')
+    return parser
+
+
+def _command_parser():
+    parser = argparse.ArgumentParser(prog='genesis COMMAND')
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND')
+    commands.required = True
+
+    upload = commands.add_parser('upload', help='Upload NGS reads')
+    upload.add_argument('project', help='Project id or slug')
+    upload.add_argument('-r', metavar='READS', help='NGS fastq file')
+    upload.add_argument('-r1', metavar='READS-1', help='NGS fastq file (mate 1)')
+    upload.add_argument('-r2', metavar='READS-2', help='NGS fastq file (mate 2)')
+    upload.set_defaults(func=cmd_upload)
+
+    batch = commands.add_parser('batch-upload', help='Upload a batch of NGS reads')
+    batch.add_argument('project', help='Project id or slug')
+    batch.add_argument('-r', metavar='READS', nargs='*', help='List of NGS fastq files')
+    batch.add_argument('-r1', metavar='READS-1', nargs='*', help='List of NGS fastq files (mate 1)')
+    batch.add_argument('-r2', metavar='READS-2', nargs='*', help='List of NGS fastq files (mate 2)')
+    batch.set_defaults(func=cmd_batch_upload)
+
+    create = commands.add_parser('create', help='Create an object from JSON on standard input')
+    create.add_argument('resource', nargs='?', default='data',
+                        choices=('data', 'project', 'processor', 'trigger', 'template'))
+    create.set_defaults(func=cmd_create)
+
+    query = commands.add_parser('query', help='List data objects')
+    query.add_argument('filters', nargs='*', metavar='FIELD=VALUE', help='Query filters')
+    query.add_argument('--project', help='Project id or slug')
+    query.set_defaults(func=cmd_query)
+
+    export = commands.add_parser('export', help='Export annotation to CSV, JSONL or Parquet')
+    export.add_argument('path', help='Output file')
+    export.add_argument('filters', nargs='*', metavar='FIELD=VALUE', help='Query filters')
+    export.add_argument('--project', help='Project id or slug')
+    export.add_argument('--format', choices=('csv', 'jsonl', 'parquet'), help='Output format')
+    export.add_argument('--columns', nargs='+', help='Annotation paths to export')
+    export.set_defaults(func=cmd_export)
+
+    download = commands.add_parser('download', help='Download files of data objects')
+    download.add_argument('field', help='Output file field, e.g. output.fastq')
+    download.add_argument('ids', nargs='*', help='Data object ids')
+    download.add_argument('-d', '--directory', default='.', help='Destination directory')
+    download.set_defaults(func=cmd_download)
+
+    wait = commands.add_parser('wait', help='Wait for data objects to finish processing')
+    wait.add_argument('ids', nargs='*', help='Data object ids')
+    wait.add_argument('--timeout', type=float, help='Timeout in seconds')
+    wait.set_defaults(func=cmd_wait)
+
+    return parser
+
+
+def _split_pipeline(argv):
+    """Split arguments into commands separated by PIPE."""
+    commands = [[]]
+    for arg in argv:
+        if arg == PIPE:
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return commands
+
+
+def _timing(enabled, label, started):
+    if enabled:
+        print("[timing] {}: {:.0f} ms".format(label, 1000 * (time.time() - started)), file=sys.stderr)
+
+
+def main(argv=None):
+    """Run the ``genesis`` command line interface."""
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Global options precede the first command
+    parser = _parser()
+    command_parser = _command_parser()
+    names = set(command_parser._subparsers._group_actions[0].choices)  # pylint: disable=protected-access
+    first = next((i for i, arg in enumerate(argv) if arg in names), len(argv))
+    args = parser.parse_args(argv[:first])
+
+    commands = [command_parser.parse_args(command) for command in _split_pipeline(argv[first:])]
+    _timing(args.timing, 'startup', _START)
+
+    # Imported after parsing, so that help and usage errors are fast
+    from .genesis import DEFAULT_EMAIL, DEFAULT_PASSWD, DEFAULT_URL, Genesis
+    from .progress import TerminalProgress
+    from .ratelimit import GenRateLimiter
+
+    rate_limiter = None
+    if args.max_requests or args.max_bytes:
+        rate_limiter = GenRateLimiter(args.max_requests, args.max_bytes, path=args.rate_limit_file)
+
+    started = time.time()
+    gen = Genesis(args.email or DEFAULT_EMAIL, args.password or DEFAULT_PASSWD, args.address or DEFAULT_URL,
+                  progress=TerminalProgress(stream=sys.stderr), rate_limiter=rate_limiter, http_cache=args.http_cache)
+    _timing(args.timing, 'sign-in', started)
+
+    context = {}
+    for command in commands:
+        started = time.time()
+        try:
+            command.func(gen, command, context)
+        except (ValueError, RuntimeError) as ex:
+            print("ERROR: {}".format(ex), file=sys.stderr)
+            return 1
+        _timing(args.timing, command.command, started)
+
+    _timing(args.timing, 'total', _START)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,16 +4,138 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 from .utils import iterate_schema
 
 
+SCHEMA_FIELDS = ('input_schema', 'output_schema', 'static_schema', 'var_template')
+ANNOTATION_FIELDS = (
+    ('input', 'input_schema'),
+    ('output', 'output_schema'),
+    ('static', 'static_schema'),
+    ('var', 'var_template'),
+)
+
+
+def flatten_field(field, schema, path):
+    """Reduce dicts of dicts to dot separated keys."""
+    flat = {}
+    for field_schema, fields, path in iterate_schema(field, schema, path):
+        name = field_schema['name']
+        typ = field_schema['type']
+        label = field_schema['label']
+        value = fields[name] if name in fields else None
+        flat[path] = {'name': name, 'value': value, 'type': typ, 'label': label}
+
+    return flat
+
+
+def flatten_annotation(data):
+    """Return flat annotation of a raw data object.
+
+    Fields missing from sparse data objects are skipped.
+
+    :param data: Data object
+    :type data: dict
+    :rtype: dict
+
+    """
+    annotation = {}
+    for field, schema in ANNOTATION_FIELDS:
+        if field in data:
+            annotation.update(flatten_field(data[field] or {}, data.get(schema) or [], field))
+    return annotation
+
+
+def annotation_layout(data, layouts=None):
+    """Return (path, name, type, label) of annotation fields of a raw data object.
+
+    The layout depends only on schemas of fields present in the object,
+    fields are listed in the order of :func:`annotation_values`. Layouts
+    stored in ``layouts`` are reused for objects with the same schema
+    instances, the dict keeps the schemas.
+
+    :param data: Data object
+    :type data: dict
+    :param layouts: Layouts by schema instances
+    :type layouts: dict
+    :rtype: list of tuples
+
+    """
+    # Fields missing from sparse data objects are skipped
+    schemas = tuple(data.get(schema) if field in data else None for field, schema in ANNOTATION_FIELDS)
+    key = tuple(id(schema) for schema in schemas)
+    if layouts is not None and key in layouts:
+        return layouts[key][1]
+
+    layout = []
+    for (field, _), schema in zip(ANNOTATION_FIELDS, schemas):
+        for field_schema, _, path in iterate_schema({}, schema or [], field):
+            layout.append((path, field_schema['name'], field_schema['type'], field_schema['label']))
+
+    if layouts is not None:
+        layouts[key] = (schemas, layout)
+    return layout
+
+
+def annotation_values(data):
+    """Return annotation values of a raw data object in layout order.
+
+    :param data: Data object
+    :type data: dict
+    :rtype: list
+
+    """
+    values = []
+    for field, schema in ANNOTATION_FIELDS:
+        if field not in data:
+            continue
+
+        # Paths are not needed, they are part of the layout
+        for field_schema, fields in iterate_schema(data[field] or {}, data.get(schema) or []):
+            values.append(fields.get(field_schema['name']))
+    return values
+
+
+def annotation_from_values(layout, values):
+    """Return flat annotation from a layout and values, see :func:`annotation_layout`."""
+    return {path: {'name': name, 'value': value, 'type': typ, 'label': label}
+            for (path, name, typ, label), value in zip(layout, values)}
+
+
+def flatten_values(data):
+    """Return annotation values of a list of raw data objects.
+
+    Used as a process pool task, so it is defined on module level. Only
+    values are returned, which are much cheaper to send back to the parent
+    process than flat annotation.
+
+    """
+    return [annotation_values(d) for d in data]
+
+
 class GenData(object):
 
-    """Genesis data object annotation."""
+    """Genesis data object annotation.
+
+    Flat annotation is built from the annotation layout and values when it
+    is first used.
+
+    """
 
-    def __init__(self, data, gencloud):
+    def __init__(self, data, gencloud, layout=None, values=None):
         self.gencloud = gencloud
-        self.update(data)
+        self.update(data, layout, values)
+
+    def update(self, data, layout=None, values=None):
+        """Update the object with new data.
+
+        :param data: Data object
+        :type data: dict
+        :param layout: Precomputed annotation layout of data, see
+            :func:`annotation_layout`
+        :type layout: list of tuples
+        :param values: Precomputed annotation values of data, see
+            :func:`annotation_values`
+        :type values: list
 
-    def update(self, data):
-        """Update the object with new data."""
+        """
         fields = [
             'id',
             'status',
@@ -35,28 +157,44 @@ class GenData(object):
             'var_template',
         ]
 
-        self.annotation = {}
+        # Sparse data objects may lack some fields
         for f in fields:
-            setattr(self, f, data[f])
-
-        self.name = data['static']['name'] if 'name' in data['static'] else ''
-
-        self.annotation.update(self._flatten_field(data['input'], data['input_schema'], 'input'))
-        self.annotation.update(self._flatten_field(data['output'], data['output_schema'], 'output'))
-        self.annotation.update(self._flatten_field(data['static'], data['static_schema'], 'static'))
-        self.annotation.update(self._flatten_field(data['var'], data['var_template'], 'var'))
-
-    def _flatten_field(self, field, schema, path):
-        """Reduce dicts of dicts to dot separated keys."""
-        flat = {}
-        for field_schema, fields, path in iterate_schema(field, schema, path):
-            name = field_schema['name']
-            typ = field_schema['type']
-            label = field_schema['label']
-            value = fields[name] if name in fields else None
-            flat[path] = {'name': name, 'value': value, 'type': typ, 'label': label}
-
-        return flat
+            setattr(self, f, data.get(f))
+
+        static = data.get('static') or {}
+        self.name = static['name'] if 'name' in static else ''
+
+        layout = annotation_layout(data) if layout is None else layout
+        values = annotation_values(data) if values is None else values
+        # Layout and values are replaced at once, so other threads never see them mismatched
+        self._source = (layout, values)
+        self._built = None
+        # Annotation with hydrated references
+        self._annotation = None
+
+    @property
+    def annotation(self):
+        """Flat annotation, with references expanded once they are hydrated."""
+        annotation = self._annotation
+        return self._flat if annotation is None else annotation
+
+    @annotation.setter
+    def annotation(self, annotation):
+        self._annotation = annotation
+
+    @property
+    def _flat(self):
+        """Flat annotation before references are hydrated."""
+        source, built = self._source, self._built
+        if built is None or built[0] is not source:
+            built = (source, annotation_from_values(*source))
+            self._built = built
+        return built[1]
+
+    def _references(self):
+        """Return ids of data objects referenced from annotation."""
+        layout, values = self._source
+        return set(value for (_, _, typ, _), value in zip(layout, values) if typ.startswith('data:') and value)
 
     def print_annotation(self):
         """Print annotation "key: value" pairs to standard output."""
@@ -74,7 +212,7 @@ class GenData(object):
 
         :param field: file field to download
         :type field: string
-        :rtype: a file handle
+        :rtype: requests.Response
 
         """
         if not field.startswith('output'):
@@ -89,6 +227,16 @@ class GenData(object):
 
         return next(self.gencloud.download([self.id], field))
 
+    def open(self, field, **kwargs):
+        """Open a file for random-access reading.
+
+        :param field: file field to open
+        :type field: string
+        :rtype: :obj:`GenRemoteFile`
+
+        """
+        return self.gencloud.open(self.id, field, **kwargs)
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,237 @@
+"""Export"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import csv
+import io
+import json
+import os
+import sys
+import warnings
+
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+BATCH_SIZE = 1000
+
+
+def annotation_row(data):
+    """Return flat annotation of a data object as a dict of values.
+
+    :param data: Data object
+    :type data: :obj:`GenData`
+    :rtype: dict
+
+    """
+    row = {'id': data.id, 'name': data.name}
+    row.update((path, ann['value']) for path, ann in data.annotation.items())
+    return row
+
+
+def select_columns(columns, paths):
+    """Resolve column selection to annotation paths.
+
+    A column selects the annotation path with the same name or, if there is
+    none, all paths below it (e.g. ``static`` selects ``static.*``).
+    Columns that select no path are kept, so objects lacking them export
+    empty values. The ``id`` column is always included.
+
+    :param columns: Selected columns, all paths if ``None``
+    :type columns: list of strings
+    :param paths: Available annotation paths
+    :type paths: iterable of strings
+    :rtype: list of strings
+
+    """
+    paths = sorted(set(paths) - {'id', 'name'})
+    if columns is None:
+        return ['id', 'name'] + paths
+
+    selected = []
+    for column in columns:
+        below = [p for p in paths if p.startswith(column + '.')]
+        if column in ('id', 'name') or column in paths or not below:
+            selected.append(column)
+        else:
+            selected.extend(below)
+
+    if 'id' not in selected:
+        selected.insert(0, 'id')
+
+    return selected
+
+
+def export_annotation(data_objects, path, fmt=None, columns=None, batch_size=BATCH_SIZE):
+    """Stream annotation of data objects to a CSV, JSONL or Parquet file.
+
+    Rows are written in batches of ``batch_size`` objects, so only one batch
+    is kept in memory. JSON lines files contain the selected paths of each
+    object. CSV and Parquet columns are resolved on the first batch and
+    paths that first appear in later batches (e.g. in objects of another
+    processor) are dropped with a warning, so pass ``columns`` when
+    exporting objects of different processors to these formats.
+
+    :param data_objects: Data objects
+    :type data_objects: iterable of :obj:`GenData`
+    :param path: Output file path
+    :type path: string
+    :param fmt: Output format (csv, jsonl or parquet), guessed from file
+        extension by default
+    :type fmt: string
+    :param columns: Annotation paths to export
+    :type columns: list of strings
+    :param batch_size: Number of rows written at once
+    :type batch_size: int
+    :rtype: number of exported rows
+
+    """
+    if fmt is None:
+        fmt = os.path.splitext(path)[1].lstrip('.').lower()
+
+    if fmt not in FORMATS:
+        raise ValueError("Export format must be one of: {}".format(', '.join(FORMATS)))
+
+    writer = None
+    dropped = set()
+    count = 0
+    batch = []
+    try:
+        for data in data_objects:
+            batch.append(annotation_row(data))
+            if len(batch) >= batch_size:
+                writer = _write_batch(writer, fmt, path, columns, batch, dropped)
+                count += len(batch)
+                batch = []
+
+        if batch or writer is None:
+            writer = _write_batch(writer, fmt, path, columns, batch, dropped)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return count
+
+
+def _write_batch(writer, fmt, path, columns, batch, dropped):
+    if WRITERS[fmt].fixed_columns:
+        paths = set()
+        for row in batch:
+            paths.update(row)
+        selected = select_columns(columns, paths)
+
+        if writer is None:
+            writer = WRITERS[fmt](path, selected)
+
+        new = set(selected) - set(writer.columns) - dropped
+        if new:
+            dropped.update(new)
+            warnings.warn("Columns missing from the first batch are not exported: {}. Pass columns to export "
+                          "objects of different processors.".format(', '.join(sorted(new))))
+
+    elif writer is None:
+        writer = WRITERS[fmt](path, columns)
+
+    writer.write(batch)
+    return writer
+
+
+def _to_text(value):
+    """Serialize nested values (e.g. file fields) to JSON strings."""
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return '{}'.format(value)
+
+
+class CsvWriter(object):
+
+    """Write annotation rows to a CSV file."""
+
+    fixed_columns = True
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        if sys.version_info < (3, ):
+            self.file = open(path, 'wb')
+        else:
+            self.file = io.open(path, 'w', newline='', encoding='utf-8')
+
+        self.writer = csv.writer(self.file)
+        self._writerow(columns)
+
+    def _writerow(self, values):
+        if sys.version_info < (3, ):
+            values = [v.encode('utf-8') for v in values]
+        self.writer.writerow(values)
+
+    def write(self, rows):
+        for row in rows:
+            self._writerow([_to_text(row.get(c)) or '' for c in self.columns])
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlWriter(object):
+
+    """Write annotation rows to a JSON lines file.
+
+    Columns are selected for each row, see :func:`select_columns`.
+
+    """
+
+    fixed_columns = False
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.file = io.open(path, 'w', encoding='utf-8')
+
+    def write(self, rows):
+        for row in rows:
+            if self.columns is not None:
+                row = {c: row.get(c) for c in select_columns(self.columns, row)}
+            self.file.write('{}\n'.format(json.dumps(row, sort_keys=True)))
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter(object):
+
+    """Write annotation rows to a Parquet file with string columns.
+
+    Requires the ``pyarrow`` package.
+
+    """
+
+    fixed_columns = True
+
+    def __init__(self, path, columns):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow, install genesis-pyapi[parquet]")
+
+        self.pyarrow = pyarrow
+        self.columns = columns
+        self.schema = pyarrow.schema([(c, pyarrow.string()) for c in columns])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        if not rows:
+            return
+
+        arrays = [self.pyarrow.array([_to_text(row.get(c)) for row in rows], type=self.pyarrow.string())
+                  for c in self.columns]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonlWriter,
+    'parquet': ParquetWriter,
+}
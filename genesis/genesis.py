@@ -2,40 +2,106 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import json
+import logging
+import multiprocessing
 import os
 import re
 import sys
+import threading
+import time
 import uuid
+from multiprocessing.pool import ThreadPool
 
 if sys.version_info < (3, ):
     import urlparse
+    string_types = basestring  # pylint: disable=undefined-variable
 else:
     from urllib import parse as urlparse
+    string_types = str
 
 import requests
 import slumber
 
-from .data import GenData
+from .data import ANNOTATION_FIELDS, SCHEMA_FIELDS, GenData, annotation_layout, annotation_values, flatten_values
+from .export import BATCH_SIZE, export_annotation
+from .progress import TerminalProgress
 from .project import GenProject
-from .utils import find_field, iterate_schema
+from .remote import GenRemoteFile
+from .session import GenSession
+from .store import GenStore
+from .uploads import GenUploadIndex
+from .utils import SingleFlight, find_field, iterate_schema
 
 
 CHUNK_SIZE = 10000
 DEFAULT_EMAIL = 'anonymous@genialis.com'
 DEFAULT_PASSWD = 'anonymous'
 DEFAULT_URL = 'https://dictyexpress.research.bcm.edu'
+DONE_STATUSES = ('done', 'error')
+QUERY_CHUNK_SIZE = 100
+PARALLEL_MIN_OBJECTS = 1000
+MAX_REFERENCE_DEPTH = 10
+SPARSE_REQUIRED_FIELDS = ('id', 'status', 'type', 'checksum', 'processor_name', 'static')
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
 
 
 class Genesis(object):
 
-    """Python API for the Genesis platform."""
+    """Python API for the Genesis platform.
 
-    def __init__(self, email=DEFAULT_EMAIL, password=DEFAULT_PASSWD, url=DEFAULT_URL):
-        self.url = url
-        self.auth = GenAuth(email, password, url)
-        self.api = slumber.API(urlparse.urljoin(url, 'api/v1/'), self.auth)
+    The client may be shared between threads. Cache updates are serialized,
+    requests are sent and annotation is flattened without holding the cache
+    lock, and concurrent requests for the same projects, data objects or
+    processors share a single HTTP request.
+
+    Pass a :obj:`GenRateLimiter` as ``rate_limiter`` to limit the request
+    and transfer rate of API calls, uploads and downloads.
+
+    Responses of API reads are revalidated with conditional requests. They
+    are kept in memory, pass a directory as ``http_cache`` to keep them
+    between processes, see :obj:`GenSession`. Projects are cached by the
+    client for its lifetime.
+
+    With ``processes`` set, annotation of large batches is flattened in a
+    pool of worker processes, which is started on first use and stopped by
+    :meth:`close`. Workers are not forked, so scripts must guard their main
+    code with ``if __name__ == '__main__':``.
+
+    """
 
-        self.cache = {'objects': {}, 'projects': None, 'project_objects': {}}
+    def __init__(self, email=DEFAULT_EMAIL, password=DEFAULT_PASSWD, url=DEFAULT_URL, store=None, upload_index=None,
+                 progress=None, processes=None, rate_limiter=None, http_cache=None):
+        auth = GenAuth(email, password, url)
+        session = GenSession(rate_limiter=rate_limiter, cache_dir=http_cache)
+        self._setup(url, auth, session, store, upload_index, progress, processes)
+
+    def _setup(self, url, auth, session, store=None, upload_index=None, progress=None, processes=None):
+        """Set up client state, API access is disabled without a session."""
+        self.url = url
+        self.auth = auth
+        self.session = session
+        self.api = None if session is None else slumber.API(urlparse.urljoin(url, 'api/v1/'), auth, session=session)
+        self.store = store if store is None or isinstance(store, GenStore) else GenStore(store)
+        self.upload_index = upload_index
+        if upload_index is not None and not isinstance(upload_index, GenUploadIndex):
+            self.upload_index = GenUploadIndex(upload_index)
+        self.progress = TerminalProgress() if progress is None else progress
+        self.processes = processes
+
+        self.cache = {'objects': {}, 'projects': None, 'project_objects': {}, 'schemas': {}}
+        self._lock = threading.RLock()
+        self._flight = SingleFlight()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def close(self):
+        """Stop the process pool used to flatten annotation."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
 
     def projects(self):
         """Return a list :obj:`GenProject` projects.
@@ -43,10 +109,17 @@ class Genesis(object):
         :rtype: list of :obj:`GenProject` projects
 
         """
-        if not ('projects' in self.cache and self.cache['projects']):
-            self.cache['projects'] = {c['id']: GenProject(c, self) for c in self.api.case.get()['objects']}
+        with self._lock:
+            if self.cache.get('projects'):
+                return self.cache['projects']
+
+        return self._flight.do('projects', self._load_projects)
 
-        return self.cache['projects']
+    def _load_projects(self):
+        projects = {c['id']: GenProject(c, self) for c in self._fetch_projects()}
+        with self._lock:
+            self.cache['projects'] = projects
+        return projects
 
     def project_data(self, project):
         """Return a list of Data objects for given project.
@@ -55,106 +128,533 @@ class Genesis(object):
         :type project: string
         :rtype: list of Data objects
 
+        """
+        project_id = self._project_id(project)
+
+        with self._lock:
+            if project_id in self.cache['project_objects']:
+                return self.cache['project_objects'][project_id]
+
+        return self._flight.do(('project_data', project_id), self._load_project_data, project_id)
+
+    def _load_project_data(self, project_id):
+        data_objects = self._add_data(self._fetch_project_data(project_id))
+        self._hydrate(data_objects)
+        with self._lock:
+            self.cache['project_objects'][project_id] = data_objects
+        return data_objects
+
+    def prefetch(self, projects=None, threads=8):
+        """Load Data objects of many projects concurrently.
+
+        Project data is fetched through a pool of at most ``threads``
+        threads. Reference fields of all loaded objects are hydrated in one
+        pass, so objects shared by several projects are processed once.
+
+        :param projects: ObjectIds or slugs of Genesis projects, all
+            projects by default
+        :type projects: list of strings
+        :param threads: Maximal number of concurrent requests
+        :type threads: int
+        :rtype: dict of lists of Data objects by project id
+
         """
         projobjects = self.cache['project_objects']
-        objects = self.cache['objects']
-        project_id = str(project)
+        if projects is None:
+            projects = self.projects()
+
+        project_ids = [self._project_id(p) for p in projects]
+        with self._lock:
+            pending = [p for p in set(project_ids) if p not in projobjects]
+
+        if pending:
+            pool = ThreadPool(min(threads, len(pending)))
+            try:
+                data = pool.map(self._fetch_project_data, pending)
+            finally:
+                pool.close()
+
+            loaded = {}
+            data_objects = {}
+            for project_id, project_data in zip(pending, data):
+                loaded[project_id] = self._add_data(project_data)
+                data_objects.update((d.id, d) for d in loaded[project_id])
+
+            self._hydrate(list(data_objects.values()))
+            with self._lock:
+                projobjects.update(loaded)
+
+        with self._lock:
+            return {p: projobjects[p] for p in project_ids}
+
+    def _project_id(self, project):
+        """Return ObjectId of a project given by ObjectId, slug or object."""
+        project_id = str(getattr(project, 'id', project))
 
         if not re.match('^[0-9a-fA-F]{24}$', project_id):
             # project_id is a slug
-            projects = self.api.case.get(url_slug=project_id)['objects']
+            projects = self._fetch_projects(url_slug=project_id)
             if len(projects) != 1:
-                raise ValueError(msg='Attribute project not a slug or ObjectId: {}'.format(project_id))
+                raise ValueError('Attribute project not a slug or ObjectId: {}'.format(project_id))
 
             project_id = str(projects[0]['id'])
 
-        if project_id not in projobjects:
-            projobjects[project_id] = []
-            data = self.api.data.get(case_ids__contains=project_id)['objects']
-            for d in data:
+        return project_id
+
+    def _fetch_projects(self, **query):
+        """Fetch raw projects."""
+        return self.api.case.get(**query)['objects']
+
+    def _fetch_project_data(self, project_id):
+        """Fetch raw Data objects of a project."""
+        return self._fetch_data(case_ids__contains=project_id)
+
+    def _fetch_data(self, **query):
+        """Fetch raw Data objects."""
+        return self.api.data.get(**query)['objects']
+
+    def _query_ids(self, **query):
+        """Return ids of Data objects matching the query."""
+        return set(d['id'] for d in self.api.dataid.get(**query)['objects'])
+
+    def data(self, fields=None, **query):
+        """Query for Data object annotation.
+
+        :param fields: Fields or annotation paths to request (e.g.
+            ``['output.exp']``), all fields by default. Schemas are taken
+            from processors instead of being sent with every object. Such
+            partial objects are not cached.
+        :type fields: list of strings
+        :rtype: list of :obj:`GenData` objects
+
+        """
+        if fields is not None:
+            query['fields'] = self._sparse_fields(fields)
+
+        key = ('data', json.dumps(query, sort_keys=True, default=str))
+        return self._flight.do(key, self._load_data, query)
+
+    def _load_data(self, query):
+        # Partial objects must not replace cached ones
+        data_objects = self._add_data(self._fetch_data(**query), cache='fields' not in query)
+        self._hydrate(data_objects)
+        return data_objects
+
+    def iter_data(self, page_size=BATCH_SIZE, fields=None, **query):
+        """Iterate over Data objects page by page.
+
+        Objects are not cached and references are not hydrated, so memory
+        use does not grow with the number of objects.
+
+        :param page_size: Number of objects fetched per request
+        :type page_size: int
+        :param fields: Fields or annotation paths to request, see
+            :meth:`data`
+        :type fields: list of strings
+        :rtype: generator of :obj:`GenData` objects
+
+        """
+        if fields is not None:
+            query['fields'] = self._sparse_fields(fields)
+
+        for d in self._iter_raw_data(page_size, **query):
+            self._share_schemas(d)
+            yield GenData(d, self)
+
+    def _sparse_fields(self, fields):
+        """Return the ``fields`` query parameter for requested fields."""
+        # Annotation paths select their top level field, schemas come from processors
+        selected = set(SPARSE_REQUIRED_FIELDS)
+        selected.update(f.split('.', 1)[0] for f in fields)
+        return ','.join(sorted(selected - set(SCHEMA_FIELDS)))
+
+    def _share_schemas(self, data):
+        """Replace schemas of a raw Data object with shared instances.
+
+        Schemas of fields of sparse objects are taken from the processor,
+        which is fetched once. Fields that were not requested get no
+        schema. Equal schemas of objects of the same processor are replaced
+        by a single instance.
+
+        """
+        processor_name = data.get('processor_name')
+        if not processor_name:
+            return
+
+        missing = [schema for field, schema in ANNOTATION_FIELDS if field in data and schema not in data]
+        if missing:
+            schemas = self._processor_schemas(processor_name)
+            for schema in missing:
+                if schema in schemas:
+                    data[schema] = schemas[schema]
+
+        with self._lock:
+            for f in SCHEMA_FIELDS:
+                if f not in data:
+                    continue
+
+                known = self.cache['schemas'].setdefault((processor_name, f), [])
+                for schema in known:
+                    if schema == data[f]:
+                        data[f] = schema
+                        break
+                else:
+                    known.append(data[f])
+
+    def _processor_schemas(self, processor_name):
+        """Return schemas of a processor, fetched once per processor."""
+        key = (processor_name, None)
+        with self._lock:
+            if key in self.cache['schemas']:
+                return self.cache['schemas'][key]
+
+        processors = self.processors(processor_name=processor_name)
+        schemas = {f: processors[0][f] for f in SCHEMA_FIELDS if processors and f in processors[0]}
+        with self._lock:
+            self.cache['schemas'][key] = schemas
+        return schemas
+
+    def _iter_raw_data(self, page_size, **query):
+        """Iterate over raw Data objects page by page."""
+        offset = 0
+        while True:
+            page = self.api.data.get(limit=page_size, offset=offset, **query)
+            for d in page['objects']:
+                yield d
+
+            offset += len(page['objects'])
+            if not page['objects'] or not page.get('meta', {}).get('next'):
+                break
+
+    def export(self, path, fmt=None, columns=None, batch_size=BATCH_SIZE, **query):
+        """Export annotation of queried Data objects to a file.
+
+        Pages of objects are written as they arrive, see
+        :obj:`genesis.export.export_annotation`. Pass ``columns`` for CSV and
+        Parquet exports of objects of different processors.
+
+        :param path: Output file path
+        :type path: string
+        :param fmt: Output format (csv, jsonl or parquet)
+        :type fmt: string
+        :param columns: Annotation paths to export
+        :type columns: list of strings
+        :param batch_size: Number of objects per page and batch
+        :type batch_size: int
+        :rtype: number of exported objects
+
+        """
+        # Request only the fields of selected columns
+        fields = None if columns is None else [c for c in columns if c not in ('id', 'name')]
+        return export_annotation(self.iter_data(page_size=batch_size, fields=fields, **query), path,
+                                 fmt=fmt, columns=columns, batch_size=batch_size)
+
+    def snapshot(self, path, projects=None):
+        """Export projects, their Data objects and processors to a file.
+
+        The snapshot can be loaded without network access with
+        :obj:`OfflineGenesis`.
+
+        :param path: Snapshot file path
+        :type path: string
+        :param projects: ObjectIds or slugs of projects, all projects by
+            default
+        :type projects: list of strings
+
+        """
+        # Imported here, because the snapshot module extends Genesis
+        from .snapshot import write_snapshot
+        write_snapshot(self, path, projects)
+
+    def _add_data(self, data, cache=True):
+        """Insert raw Data objects into cache or update cached ones.
+
+        Annotation values are extracted before the cache lock is taken,
+        layouts are computed once per set of shared schemas. When the client
+        has ``processes`` set, values of large batches are extracted in a
+        process pool.
+
+        :param data: Data objects
+        :type data: iterable of dicts
+        :param cache: Insert objects into cache, new objects are returned
+            otherwise
+        :type cache: bool
+        :rtype: list of :obj:`GenData` objects
+
+        """
+        objects = self.cache['objects']
+        data_objects = []
+
+        data = list(data)
+        for d in data:
+            self._share_schemas(d)
+
+        if self.processes and len(data) >= PARALLEL_MIN_OBJECTS:
+            values = self._flatten_parallel(data)
+        else:
+            values = [annotation_values(d) for d in data]
+
+        known_layouts = {}
+        layouts = [annotation_layout(d, known_layouts) for d in data]
+
+        if not cache:
+            return [GenData(d, self, layout, v) for d, layout, v in zip(data, layouts, values)]
+
+        with self._lock:
+            for d, layout, v in zip(data, layouts, values):
                 _id = d['id']
                 if _id in objects:
                     # Update existing object
-                    objects[_id].update(d)
+                    objects[_id].update(d, layout, v)
                 else:
                     # Insert new object
-                    objects[_id] = GenData(d, self)
-
-                projobjects[project_id].append(objects[_id])
-
-            # Hydrate reference fields
-            for d in projobjects[project_id]:
-                while True:
-                    ref_annotation = {}
-                    remove_annotation = []
-                    for path, ann in d.annotation.items():
-                        if ann['type'].startswith('data:'):
-                            # Referenced data object found
-                            # Copy annotation
-                            if ann['value'] in self.cache['objects']:
-                                annotation = self.cache['objects'][ann['value']].annotation
-                                ref_annotation.update({path + '.' + k: v for k, v in annotation.items()})
-
-                            remove_annotation.append(path)
-                    if ref_annotation:
-                        d.annotation.update(ref_annotation)
-                        for path in remove_annotation:
-                            del d.annotation[path]
-                    else:
-                        break
+                    objects[_id] = GenData(d, self, layout, v)
+
+                data_objects.append(objects[_id])
+
+        return data_objects
 
-        return projobjects[project_id]
+    def _flatten_parallel(self, data):
+        """Extract annotation values of raw Data objects in a process pool.
 
-    def data(self, **query):
-        """Query for Data object annotation."""
+        Workers receive only annotation fields and schemas and return only
+        values, flat annotation is built from them when it is first used.
+
+        :param data: Data objects
+        :type data: list of dicts
+        :rtype: list of lists
+
+        """
+        annotation_fields = [f for pair in ANNOTATION_FIELDS for f in pair]
+        compact = [{f: d.get(f) for f in annotation_fields} for d in data]
+
+        # A few chunks per process balance the load without much pickling overhead
+        chunk_size = -(-len(compact) // (self.processes * 4))
+        chunks = [compact[i:i + chunk_size] for i in range(0, len(compact), chunk_size)]
+
+        results = self._process_pool().map(flatten_values, chunks)
+        return [values for chunk in results for values in chunk]
+
+    def _process_pool(self):
+        """Return the process pool of the client, created on first use.
+
+        Workers are started with the ``forkserver`` or ``spawn`` method, so
+        they do not inherit locks and threads of the client.
+
+        """
+        with self._pool_lock:
+            if self._pool is None:
+                if hasattr(multiprocessing, 'get_context'):
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                else:
+                    # Python 2 can only fork
+                    context = multiprocessing
+                self._pool = context.Pool(self.processes)
+            return self._pool
+
+    def _hydrate(self, data_objects):
+        """Replace reference fields with annotation of referenced objects.
+
+        Referenced objects missing from cache are fetched in bulk, one
+        level of references at a time. Expanded annotation of every object
+        is computed once and reused by all objects that reference it.
+        References that form a cycle or are nested deeper than
+        MAX_REFERENCE_DEPTH are left unexpanded.
+
+        """
+        self._fetch_references(data_objects)
+
+        # Annotation of objects without references is left to be built on first use
+        data_objects = [d for d in data_objects if self._references(d)]
+        with self._lock:
+            expanded = {}
+            annotations = [self._expand(d, (), expanded)[0] for d in data_objects]
+            for d, annotation in zip(data_objects, annotations):
+                d.annotation = annotation
+
+    @staticmethod
+    def _references(data_object):
+        """Return ids of data objects referenced from annotation."""
+        return data_object._references()  # pylint: disable=protected-access
+
+    def _fetch_references(self, data_objects):
+        """Fetch uncached referenced objects with bulk queries."""
         objects = self.cache['objects']
-        data = self.api.data.get(**query)['objects']
-        data_objects = []
+        visited = set(d.id for d in data_objects)
+        requested = set()
+        frontier = data_objects
+
+        for _ in range(MAX_REFERENCE_DEPTH):
+            refs = set()
+            for d in frontier:
+                refs.update(self._references(d))
+
+            with self._lock:
+                missing = refs - requested - set(objects)
+            requested.update(missing)
+            self._load_objects(sorted(missing))
+
+            with self._lock:
+                frontier = [objects[r] for r in refs - visited if r in objects]
+            visited.update(refs)
+            if not frontier:
+                break
+
+    def _expand(self, data_object, stack, expanded):
+        """Return annotation of a data object with references expanded.
+
+        An expansion cut short by a cycle or by the depth limit depends on
+        the path of references it was reached by, so only complete
+        expansions are memoized. They are reused where their height, the
+        length of their longest chain of references, fits within the depth
+        limit.
+
+        :param data_object: Data object
+        :type data_object: :obj:`GenData`
+        :param stack: Ids of objects being expanded that reference it
+        :type stack: tuple of strings
+        :param expanded: Complete expanded annotation and height by object id
+        :type expanded: dict
+        :rtype: tuple of annotation and its height, ``None`` if incomplete
 
-        for d in data:
-            _id = d['id']
-            if _id in objects:
-                # Update existing object
-                objects[_id].update(d)
+        """
+        objects = self.cache['objects']
+        # Uncached (partial) objects must not stand in for cached ones
+        shared = objects.get(data_object.id) is data_object
+        if shared and data_object.id in expanded:
+            annotation, height = expanded[data_object.id]
+            if len(stack) + height <= MAX_REFERENCE_DEPTH:
+                return annotation, height
+
+        if not any(ref in objects for ref in self._references(data_object)):
+            # Nothing to expand, the annotation is shared instead of copied
+            annotation, height = data_object._flat, 0  # pylint: disable=protected-access
+            if shared:
+                expanded[data_object.id] = (annotation, height)
+            return annotation, height
+
+        stack = stack + (data_object.id,)
+        annotation = {}
+        height = 0
+
+        for path, ann in data_object._flat.items():  # pylint: disable=protected-access
+            ref = ann['value'] if ann['type'].startswith('data:') else None
+            if ref is None or ref not in objects:
+                annotation[path] = ann
+            elif ref in stack or len(stack) > MAX_REFERENCE_DEPTH:
+                annotation[path] = ann
+                height = None
             else:
-                # Insert new object
-                objects[_id] = GenData(d, self)
+                # Referenced data object found
+                # Copy its expanded annotation
+                ref_annotation, ref_height = self._expand(objects[ref], stack, expanded)
+                if height is not None:
+                    height = None if ref_height is None else max(height, ref_height + 1)
+                for k, v in ref_annotation.items():
+                    annotation[path + '.' + k] = v
+
+        if shared and height is not None:
+            expanded[data_object.id] = (annotation, height)
+        return annotation, height
+
+    def wait(self, data_ids, statuses=DONE_STATUSES, interval=1, max_interval=30, timeout=None, event=None):
+        """Wait for data objects to reach one of the given statuses.
+
+        All pending objects are polled with a single bulk query per
+        interval. The interval starts at ``interval`` seconds, grows while
+        nothing changes and is reset as soon as an object completes. Cached
+        :obj:`GenData` objects are updated in place and their references are
+        hydrated again.
+
+        A push channel (see ``GenAuth.subscribe_id``) can wake the poller
+        early by setting ``event``; it is cleared before each poll.
+
+        :param data_ids: Data object ids
+        :type data_ids: list of UUID strings
+        :param statuses: Statuses that mark an object as completed
+        :type statuses: tuple of strings
+        :param interval: Initial polling interval in seconds
+        :type interval: float
+        :param max_interval: Maximal polling interval in seconds
+        :type max_interval: float
+        :param timeout: Give up after this many seconds
+        :type timeout: float
+        :param event: Event set by a push channel on data changes
+        :type event: :obj:`threading.Event`
+        :rtype: generator of completed :obj:`GenData` objects
 
-            data_objects.append(objects[_id])
+        """
+        pending = [str(_id) for _id in data_ids]
+        started = time.time()
+        delay = interval
+
+        while True:
+            completed = []
+            found = set()
+            data_objects = self._load_objects(pending)
+            self._hydrate(data_objects)
+            for d in data_objects:
+                found.add(d.id)
+                if d.status in statuses:
+                    completed.append(d)
+
+            missing = set(pending) - found
+            if missing:
+                raise ValueError("Data objects not found: {}".format(', '.join(sorted(missing))))
+
+            for d in completed:
+                pending.remove(d.id)
+                yield d
+
+            if not pending:
+                return
+
+            delay = interval if completed else min(delay * 1.5, max_interval)
+            if timeout is not None:
+                remaining = timeout - (time.time() - started)
+                if remaining <= 0:
+                    raise RuntimeError("Timeout waiting for data objects {}".format(', '.join(pending)))
+                delay = min(delay, remaining)
+
+            if event is None:
+                time.sleep(delay)
+            else:
+                event.wait(delay)
+                event.clear()
 
-        # Hydrate reference fields
-        for d in data_objects:
-            count += 1
-            while True:
-                ref_annotation = {}
-                remove_annotation = []
-                for path, ann in d.annotation.items():
-                    if ann['type'].startswith('data:'):
-                        # Referenced data object found
-                        # Copy annotation
-                        _id = ann['value']
-                        if _id not in objects:
-                            try:
-                                d_tmp = self.api.data(_id).get()
-                            except slumber.exceptions.HttpClientError as ex:
-                                if ex.response.status_code == 404:
-                                    continue
-                                else:
-                                    raise ex
-
-                            objects[_id] = GenData(d_tmp, self)
-
-                        annotation = objects[_id].annotation
-                        ref_annotation.update({path + '.' + k: v for k, v in annotation.items()})
-                        remove_annotation.append(path)
-                if ref_annotation:
-                    d.annotation.update(ref_annotation)
-                    for path in remove_annotation:
-                        del d.annotation[path]
-                else:
-                    break
+    def _load_objects(self, data_ids):
+        """Fetch data objects into cache with bulk ``id__in`` queries.
 
-        return data_objects
+        Ids that another thread is already fetching are not queried again,
+        the objects it fetches are returned instead.
+
+        :param data_ids: Data object ids
+        :type data_ids: list of UUID strings
+        :rtype: list of found :obj:`GenData` objects in order of ids
+
+        """
+        def load(keys):
+            data_objects = self._add_data(self._data_by_ids([_id for _, _id in keys]))
+            return {('data_id', d.id): d for d in data_objects}
+
+        keys = [('data_id', _id) for _id in data_ids]
+        loaded = self._flight.do_many(keys, load)
+        return [loaded[key] for key in keys if key in loaded]
+
+    def _data_by_ids(self, data_ids):
+        """Fetch raw data objects with bulk ``id__in`` queries.
+
+        :param data_ids: Data object ids
+        :type data_ids: list of UUID strings
+        :rtype: generator of data object dicts
+
+        """
+        data_ids = list(data_ids)
+        for i in range(0, len(data_ids), QUERY_CHUNK_SIZE):
+            chunk = data_ids[i:i + QUERY_CHUNK_SIZE]
+            for d in self.api.data.get(id__in=','.join(chunk), limit=len(chunk))['objects']:
+                yield d
 
     def processors(self, processor_name=None):
         """Return a list of Processor objects.
@@ -165,9 +665,12 @@ class Genesis(object):
 
         """
         if processor_name:
-            return self.api.processor.get(name=processor_name)['objects']
+            return self._flight.do(('processors', processor_name), self._load_processors, name=processor_name)
         else:
-            return self.api.processor.get()['objects']
+            return self._flight.do(('processors', None), self._load_processors)
+
+    def _load_processors(self, **query):
+        return self.api.processor.get(**query)['objects']
 
     def print_upload_processors(self):
         """Print all upload processor names."""
@@ -230,19 +733,30 @@ class Genesis(object):
             resource = 'case'
 
         url = urlparse.urljoin(self.url, '/api/v1/{}/'.format(resource))
-        return requests.post(url,
-                             data=data,
-                             auth=self.auth,
-                             headers={
-                                 'cache-control': 'no-cache',
-                                 'content-type': 'application/json',
-                                 'accept': 'application/json, text/plain, */*',
-                                 'referer': self.url,
-                             })
+        return self.session.post(url, data=data, auth=self.auth, headers=self._json_headers())
+
+    def _json_headers(self):
+        """Return headers of JSON requests that modify resources."""
+        return {
+            'cache-control': 'no-cache',
+            'content-type': 'application/json',
+            'accept': 'application/json, text/plain, */*',
+            'referer': self.url,
+        }
 
     def upload(self, project_id, processor_name, **fields):
         """Upload files and data objects.
 
+        A file field value is a file path, a ``(file name, source)`` tuple
+        or a source with a name. Sources are file-like objects, iterables of
+        bytes of unknown length or :obj:`requests.Response` objects (e.g.
+        from :meth:`download` of another Genesis instance), which are
+        streamed without staging on disk.
+
+        When an upload index is configured, files are checksummed first. If
+        the same files were already uploaded with the same processor and
+        inputs, the existing data object is added to the project instead.
+
         :param project_id: ObjectId of Genesis project
         :type project_id: string
         :param processor_name: Processor object name
@@ -264,21 +778,43 @@ class Genesis(object):
                 Exception("Field {} not in processor {} inputs".format(field_name, p['name']))
 
             if find_field(p['input_schema'], field_name)['type'].startswith('basic:file:'):
-                if not os.path.isfile(field_val):
+                if isinstance(field_val, string_types) and not os.path.isfile(field_val):
                     Exception("File {} not found".format(field_val))
 
+        file_fields = [name for name in fields
+                       if find_field(p['input_schema'], name)['type'].startswith('basic:file:')]
+
+        upload_key = None
+        # Only files on disk can be checksummed before they are uploaded
+        if self.upload_index is not None and all(isinstance(fields[name], string_types) for name in file_fields):
+            checksums = self.upload_index.checksums([fields[name] for name in file_fields])
+            self.upload_index.save()
+
+            key_inputs = dict(fields)
+            key_inputs.update(zip(file_fields, checksums))
+            upload_key = GenUploadIndex.upload_key(processor_name, key_inputs)
+
+            data_id = self.upload_index.get_upload(upload_key)
+            if data_id is not None:
+                existing = list(self._data_by_ids([data_id]))
+                if existing and existing[0]['status'] != 'error':
+                    return self._link_data(existing[0], project_id)
+
+                self.upload_index.remove_upload(upload_key)
+
         inputs = {}
 
         for field_name, field_val in fields.items():
-            if find_field(p['input_schema'], field_name)['type'].startswith('basic:file:'):
+            if field_name in file_fields:
 
-                file_temp = self._upload_file(field_val)
+                base_name, chunks, size = self._upload_source(field_val)
+                file_temp = self._upload_chunks(base_name, chunks, size)
 
                 if not file_temp:
                     Exception("Upload failed for {}".format(field_val))
 
                 inputs[field_name] = {
-                    'file': field_val,
+                    'file': field_val if isinstance(field_val, string_types) else base_name,
                     'file_temp': file_temp
                 }
             else:
@@ -291,62 +827,157 @@ class Genesis(object):
             'input': inputs,
         }
 
-        return self.create(d)
+        response = self.create(d)
+
+        if upload_key is not None and response.status_code in [200, 201]:
+            data_id = self._created_id(response)
+            if data_id is not None:
+                self.upload_index.set_upload(upload_key, data_id)
 
-    def _upload_file(self, fn):
+        return response
+
+    def _link_data(self, data, project_id):
+        """Add an existing data object to a project.
+
+        :param data: Data object
+        :type data: dict
+        :param project_id: ObjectId of Genesis project
+        :type project_id: string
+        :rtype: HTTP Response object
+
+        """
+        case_ids = list(data.get('case_ids', []))
+        if project_id not in case_ids:
+            case_ids.append(project_id)
+
+        url = urlparse.urljoin(self.url, '/api/v1/data/{}/'.format(data['id']))
+        return self.session.patch(url, data=json.dumps({'case_ids': case_ids}), auth=self.auth,
+                                  headers=self._json_headers())
+
+    def _created_id(self, response):
+        """Return id of a created object from response body or location."""
+        try:
+            return response.json()['id']
+        except (ValueError, KeyError, TypeError):
+            pass
+
+        location = response.headers.get('location', '').rstrip('/')
+        return location.rsplit('/', 1)[-1] or None
+
+    def _upload_file(self, src):
         """Upload a single file on the platform.
 
-        File is uploaded in chunks of 1,024 bytes.
+        File is uploaded in chunks of CHUNK_SIZE bytes. When the size of a
+        stream is not known, it is sent with the last chunk.
 
-        :param fn: File path
-        :type fn: string
+        :param src: File path or source, see :meth:`upload`
+        :type src: string, tuple, file-like object or iterable of bytes
 
         """
-        size = os.path.getsize(fn)
-        counter = 0
-        base_name = os.path.basename(fn)
+        return self._upload_chunks(*self._upload_source(src))
+
+    def _upload_chunks(self, base_name, chunks, size):
+        """Upload file content and return the upload session id."""
+        offset = 0
         session_id = str(uuid.uuid4())
+        transfer = self.progress.start('Uploading {}'.format(base_name), size)
+
+        chunks = self._rechunk(chunks)
+        chunk = next(chunks, None)
+        while chunk is not None:
+            response = None
+            next_chunk = next(chunks, None)
+            total = size if size is not None else (offset + len(chunk) if next_chunk is None else '*')
+
+            for i in range(5):
+                content_range = 'bytes {}-{}/{}'.format(offset, offset + len(chunk) - 1, total)
+                if i > 0 and response is not None:
+                    logger.warning("Chunk upload failed (error %s): repeating %s", response.status_code, content_range)
+
+                headers = {
+                    'Content-Disposition': 'attachment; filename="{}"'.format(base_name),
+                    'Content-Range': content_range,
+                    'Content-Type': 'application/octet-stream',
+                    'Session-Id': session_id,
+                }
+                if size is not None:
+                    headers['Content-Length'] = str(size)
+
+                response = self.session.post(urlparse.urljoin(self.url, 'upload/'),
+                                             auth=self.auth,
+                                             data=chunk,
+                                             headers=headers)
+
+                if response.status_code in [200, 201]:
+                    break
+            else:
+                # Upload of a chunk failed (5 retries)
+                self.progress.finish(transfer)
+                return None
+
+            self.progress.update(transfer, len(chunk))
+            offset += len(chunk)
+            chunk = next_chunk
+
+        self.progress.finish(transfer)
+        return session_id
+
+    def _upload_source(self, src):
+        """Return file name, content chunks and size (if known) of a source."""
+        name = None
+        if isinstance(src, tuple):
+            name, src = src
+
+        if isinstance(src, string_types):
+            return name or os.path.basename(src), self._read_file(src), os.path.getsize(src)
+
+        if isinstance(src, requests.Response):
+            src.raise_for_status()
+            # Content-Length is the size of encoded content, iter_content yields decoded bytes
+            size = None if src.headers.get('content-encoding') else src.headers.get('content-length')
+            url_name = urlparse.unquote(urlparse.urlparse(src.url or '').path.rstrip('/').rsplit('/', 1)[-1])
+            return name or url_name or 'upload', src.iter_content(CHUNK_SIZE), int(size) if size else None
+
+        if name is None and isinstance(getattr(src, 'name', None), string_types):
+            name = os.path.basename(src.name)
+
+        if name is None:
+            raise ValueError("File name of upload source {!r} is not known, pass a (name, source) tuple".format(src))
+
+        if hasattr(src, 'read'):
+            return name, iter(lambda: src.read(CHUNK_SIZE), b''), None
 
+        return name, iter(src), None
+
+    @staticmethod
+    def _read_file(fn):
         with open(fn, 'rb') as f:
             while True:
-                response = None
                 chunk = f.read(CHUNK_SIZE)
                 if not chunk:
                     break
+                yield chunk
 
-                for i in range(5):
-                    content_range = 'bytes {}-{}/{}'.format(counter * CHUNK_SIZE,
-                                                            counter * CHUNK_SIZE + len(chunk) - 1, size)
-                    if i > 0 and response is not None:
-                        print("Chunk upload failed (error {}): repeating {}"
-                              .format(response.status_code, content_range))
+    @staticmethod
+    def _rechunk(chunks):
+        """Regroup chunks of any size into chunks of CHUNK_SIZE bytes."""
+        buf = bytearray()
+        for data in chunks:
+            buf.extend(data)
+            while len(buf) >= CHUNK_SIZE:
+                yield bytes(buf[:CHUNK_SIZE])
+                del buf[:CHUNK_SIZE]
 
-                    response = requests.post(urlparse.urljoin(self.url, 'upload/'),
-                                             auth=self.auth,
-                                             data=chunk,
-                                             headers={
-                                                 'Content-Disposition': 'attachment; filename="{}"'.format(base_name),
-                                                 'Content-Length': size,
-                                                 'Content-Range': content_range,
-                                                 'Content-Type': 'application/octet-stream',
-                                                 'Session-Id': session_id})
-
-                    if response.status_code in [200, 201]:
-                        break
-                else:
-                    # Upload of a chunk failed (5 retries)
-                    return None
-
-                progress = 100. * (counter * CHUNK_SIZE + len(chunk)) / size
-                sys.stdout.write("\r{:.0f} % Uploading {}".format(progress, fn))
-                sys.stdout.flush()
-                counter += 1
-        print()
-        return session_id
+        if buf:
+            yield bytes(buf)
 
     def download(self, data_objects, field):
         """Download files of data objects.
 
+        Uncached data objects are resolved with bulk queries in chunks. The
+        next chunk is resolved in the background while files of the current
+        one are downloaded.
+
         :param data_objects: Data object ids
         :type data_objects: list of UUID strings
         :param field: Download field name
@@ -357,25 +988,173 @@ class Genesis(object):
         if not field.startswith('output'):
             raise ValueError("Only processor results (output.* fields) can be downloaded")
 
-        for o in data_objects:
-            o = str(o)
-            if re.match('^[0-9a-fA-F]{24}$', o) is None:
-                raise ValueError("Invalid object id {}".format(o))
+        data_ids = [self._check_id(o) for o in data_objects]
+        chunks = [data_ids[i:i + QUERY_CHUNK_SIZE] for i in range(0, len(data_ids), QUERY_CHUNK_SIZE)]
+
+        if len(chunks) < 2:
+            for obj in self._file_objects(data_ids, field):
+                yield self._download(obj, field)
+            return
+
+        pool = ThreadPool(1)
+        try:
+            pending = pool.apply_async(self._file_objects, (chunks[0], field))
+            for i in range(len(chunks)):
+                objs = pending.get()
+                if i + 1 < len(chunks):
+                    pending = pool.apply_async(self._file_objects, (chunks[i + 1], field))
+
+                for obj in objs:
+                    yield self._download(obj, field)
+        finally:
+            # Do not resolve more chunks when the caller stops early
+            pool.terminate()
+
+    def open(self, data_id, field, **kwargs):
+        """Open a file of a data object for random-access reading.
+
+        Only the requested bytes are transferred, see
+        :obj:`GenRemoteFile` for keyword arguments.
+
+        :param data_id: Data object id
+        :type data_id: UUID string
+        :param field: File field name
+        :type field: string
+        :rtype: :obj:`GenRemoteFile`
+
+        """
+        if not field.startswith('output'):
+            raise ValueError("Only processor results (output.* fields) can be downloaded")
+
+        obj = self._file_object(data_id, field)
+        return GenRemoteFile(self._file_url(obj, field), auth=self.auth, session=self.session, **kwargs)
+
+    def _check_id(self, data_id):
+        """Return data object id as string if it is valid."""
+        o = str(data_id)
+        if re.match('^[0-9a-fA-F]{24}$', o) is None:
+            raise ValueError("Invalid object id {}".format(o))
+
+        return o
+
+    def _file_objects(self, data_ids, field):
+        """Return data objects, fetching uncached ones in bulk, and check file field."""
+        with self._lock:
+            missing = sorted(set(o for o in data_ids if o not in self.cache['objects']))
+
+        if missing:
+            found = set(d.id for d in self._load_objects(missing))
+            not_found = set(missing) - found
+            if not_found:
+                raise ValueError("Data objects not found: {}".format(', '.join(sorted(not_found))))
+
+        return [self._file_object(o, field) for o in data_ids]
+
+    def _file_object(self, data_id, field):
+        """Return a cached data object and check that field is a file."""
+        o = self._check_id(data_id)
+
+        with self._lock:
+            obj = self.cache['objects'].get(o)
+
+        if obj is None:
+            found = self._load_objects([o])
+            if not found:
+                raise ValueError("Data object {} not found".format(o))
+            obj = found[0]
+
+        if field not in obj.annotation:
+            raise ValueError("Download field {} does not exist".format(field))
 
-            if o not in self.cache['objects']:
-                self.cache['objects'][o] = GenData(self.api.data(o).get(), self)
+        ann = obj.annotation[field]
+        if ann['type'] != 'basic:file:':
+            raise ValueError("Only basic:file: field can be downloaded")
 
-            if field not in self.cache['objects'][o].annotation:
-                raise ValueError("Download field {} does not exist".format(field))
+        return obj
 
-            ann = self.cache['objects'][o].annotation[field]
-            if ann['type'] != 'basic:file:':
-                raise ValueError("Only basic:file: field can be downloaded")
+    def _file_url(self, obj, field):
+        """Return the URL of a file field."""
+        return urlparse.urljoin(self.url, 'data/{}/{}'.format(obj.id, obj.annotation[field]['value']['file']))
 
-        for o in data_objects:
-            ann = self.cache['objects'][o].annotation[field]
-            url = urlparse.urljoin(self.url, 'data/{}/{}'.format(o, ann['value']['file']))
-            yield requests.get(url, stream=True, auth=self.auth)
+    def _download(self, obj, field):
+        """Download a file field of a data object.
+
+        When a :obj:`GenStore` is configured, the file is served from the
+        store and fetched into it on a miss.
+
+        :rtype: requests.Response
+
+        """
+        url = self._file_url(obj, field)
+
+        if self.store is None or not obj.checksum:
+            return self.session.get(url, stream=True, auth=self.auth)
+
+        key = GenStore.key(obj.checksum, field)
+        path = self.store.get(key)
+        if path is None:
+            path = self._flight.do(('store', key), self._store_file, key, url)
+
+        return self._stored_response(path, url)
+
+    @staticmethod
+    def _stored_response(path, url):
+        """Return a stored file as a streamed response."""
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.url = url
+        response.headers['Content-Length'] = str(os.path.getsize(path))
+        response.raw = open(path, 'rb')
+        return response
+
+    def _store_file(self, key, url):
+        response = self.session.get(url, stream=True, auth=self.auth)
+        response.raise_for_status()
+        return self.store.put(key, self._iter_progress(response, 'Downloading {}'.format(url)))
+
+    def download_files(self, data_objects, field, directory='.'):
+        """Download files of data objects into a directory.
+
+        Progress is reported to the client :obj:`Progress` reporter. Files
+        served from a :obj:`GenStore` are hard linked when possible.
+
+        :param data_objects: Data object ids
+        :type data_objects: list of UUID strings
+        :param field: Download field name
+        :type field: string
+        :param directory: Destination directory
+        :type directory: string
+        :rtype: list of file paths
+
+        """
+        paths = []
+        for o, response in zip(data_objects, self.download(data_objects, field)):
+            obj = self._file_object(o, field)
+            path = os.path.join(directory, os.path.basename(obj.annotation[field]['value']['file']))
+
+            if self.store is not None and obj.checksum and self.store.link(GenStore.key(obj.checksum, field), path):
+                response.close()
+            else:
+                response.raise_for_status()
+                with open(path, 'wb') as f:
+                    for chunk in self._iter_progress(response, 'Downloading {}'.format(path)):
+                        f.write(chunk)
+
+            paths.append(path)
+
+        return paths
+
+    def _iter_progress(self, response, name):
+        """Iterate over response content and report progress."""
+        size = response.headers.get('content-length')
+        transfer = self.progress.start(name, int(size) if size else None)
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                self.progress.update(transfer, len(chunk))
+                yield chunk
+        finally:
+            self.progress.finish(transfer)
 
 
 class GenAuth(requests.auth.AuthBase):
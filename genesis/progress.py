@@ -0,0 +1,170 @@
+"""Progress"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import itertools
+import logging
+import sys
+import threading
+import time
+
+
+def format_size(size):
+    """Return human readable size of bytes."""
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if abs(size) < 1000:
+            return '{:.1f} {}'.format(size, unit)
+        size /= 1000.
+    return '{:.1f} TB'.format(size)
+
+
+def format_time(seconds):
+    """Return seconds as H:MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02d}:{:02d}'.format(hours, minutes, seconds)
+
+
+class Progress(object):
+
+    """Progress of uploads and downloads.
+
+    Transfers are registered with :meth:`start`, reported with
+    :meth:`update` and completed with :meth:`finish`. Progress of all
+    concurrent transfers is aggregated and passed to :meth:`render` at most
+    once per ``interval`` seconds. The base class renders nothing.
+
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._transfers = {}
+        self._ids = itertools.count()
+        self._last_render = 0
+
+    def start(self, name, total=None):
+        """Register a transfer and return its id.
+
+        :param name: Transfer name, e.g. file name
+        :type name: string
+        :param total: Transfer size in bytes, if known
+        :type total: int
+        :rtype: int
+
+        """
+        with self._lock:
+            transfer_id = next(self._ids)
+            self._transfers[transfer_id] = {'name': name, 'total': total, 'done': 0, 'started': time.time()}
+        return transfer_id
+
+    def update(self, transfer_id, nbytes):
+        """Report ``nbytes`` transferred bytes."""
+        with self._lock:
+            self._transfers[transfer_id]['done'] += nbytes
+        self._render()
+
+    def finish(self, transfer_id):
+        """Complete a transfer."""
+        with self._lock:
+            transfer = self._transfers[transfer_id]
+            if transfer['total'] is None:
+                transfer['total'] = transfer['done']
+            transfer['finished'] = True
+        self._render(force=True)
+
+    def stats(self):
+        """Return aggregate progress of all active transfers.
+
+        :rtype: dict with ``names``, ``done`` and ``total`` bytes,
+            ``rate`` in bytes per second, ``eta`` in seconds and
+            ``finished`` flag
+
+        """
+        with self._lock:
+            transfers = list(self._transfers.values())
+
+        done = sum(t['done'] for t in transfers)
+        totals = [t['total'] for t in transfers]
+        total = None if None in totals else sum(totals)
+        elapsed = time.time() - min(t['started'] for t in transfers) if transfers else 0
+        rate = done / elapsed if elapsed > 0 else 0.
+        eta = (total - done) / rate if total is not None and rate > 0 else None
+
+        return {
+            'names': [t['name'] for t in transfers],
+            'done': done,
+            'total': total,
+            'rate': rate,
+            'eta': eta,
+            'finished': all(t.get('finished') for t in transfers),
+        }
+
+    def _render(self, force=False):
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_render < self.interval:
+                return
+            self._last_render = now
+
+        stats = self.stats()
+        self.render(stats)
+
+        if stats['finished']:
+            with self._lock:
+                self._transfers = {k: t for k, t in self._transfers.items() if not t.get('finished')}
+
+    def render(self, stats):
+        """Render aggregate progress, see :meth:`stats`."""
+
+    @staticmethod
+    def describe(stats):
+        """Return a one line description of aggregate progress."""
+        parts = []
+        if stats['total']:
+            parts.append('{:.0f} %'.format(100. * stats['done'] / stats['total']))
+        parts.append(format_size(stats['done']))
+        parts.append('{}/s'.format(format_size(stats['rate'])))
+        if stats['eta'] is not None and not stats['finished']:
+            parts.append('ETA {}'.format(format_time(stats['eta'])))
+
+        names = stats['names']
+        parts.append(names[0] if len(names) == 1 else '{} transfers'.format(len(names)))
+        return ' '.join(parts)
+
+
+class SilentProgress(Progress):
+
+    """Do not report progress."""
+
+
+class TerminalProgress(Progress):
+
+    """Report progress on a single terminal line."""
+
+    def __init__(self, interval=0.5, stream=None):
+        super(TerminalProgress, self).__init__(interval)
+        self.stream = stream
+        self._width = 0
+
+    def render(self, stats):
+        stream = self.stream or sys.stdout
+        line = self.describe(stats)
+        # Pad with spaces to overwrite a longer previous line
+        stream.write('\r{}{}'.format(line, ' ' * (self._width - len(line))))
+        self._width = 0 if stats['finished'] else len(line)
+        if stats['finished']:
+            stream.write('\n')
+        stream.flush()
+
+
+class LoggingProgress(Progress):
+
+    """Report progress to a logger."""
+
+    def __init__(self, interval=10.0, logger=None, level=logging.INFO):
+        super(LoggingProgress, self).__init__(interval)
+        self.logger = logger or logging.getLogger('genesis')
+        self.level = level
+
+    def render(self, stats):
+        self.logger.log(self.level, self.describe(stats))
@@ -1,6 +1,13 @@
 """Project"""
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import sys
+
+if sys.version_info < (3, ):
+    import urlparse
+else:
+    from urllib import parse as urlparse
+
 
 class GenProject(object):
 
@@ -23,12 +30,43 @@ class GenProject(object):
         """Query for Data object annotation."""
         data = self.gencloud.project_data(self.id)
         query['case_ids__contains'] = self.id
-        ids = set(d['id'] for d in self.gencloud.api.dataid.get(**query)['objects'])
+        ids = self.gencloud._query_ids(**query)  # pylint: disable=protected-access
         return [d for d in data if d.id in ids]
 
+    def export(self, path, fmt=None, columns=None, **query):
+        """Export annotation of project Data objects to a file.
+
+        :param path: Output file path
+        :type path: string
+        :param fmt: Output format (csv, jsonl or parquet)
+        :type fmt: string
+        :param columns: Annotation paths to export
+        :type columns: list of strings
+        :rtype: number of exported objects
+
+        """
+        query['case_ids__contains'] = self.id
+        return self.gencloud.export(path, fmt=fmt, columns=columns, **query)
+
     def find(self, filter_str):
-        """Filter Data object annotation."""
-        raise NotImplementedError()
+        """Filter Data object annotation.
+
+        Filters use the syntax of API query strings and are matched like
+        :meth:`data` queries, e.g. against the index of a snapshot by
+        :obj:`OfflineGenesis`.
+
+        :param filter_str: Query filters, e.g.
+            ``status=done&type__startswith=data:reads:``
+        :type filter_str: string
+        :rtype: list of :obj:`GenData` objects
+
+        """
+        try:
+            query = dict(urlparse.parse_qsl(filter_str, strict_parsing=True))
+        except ValueError:
+            raise ValueError("Filter {} is not in FIELD=VALUE&... format".format(filter_str))
+
+        return self.data(**query)
 
     def __str__(self):
         return self.name or 'n/a'
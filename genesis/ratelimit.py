@@ -0,0 +1,137 @@
+"""Rate limiting"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Tokens and refill time of the request and byte buckets
+STATE_FORMAT = '<dddd'
+STATE_SIZE = struct.calcsize(STATE_FORMAT)
+
+
+class GenRateLimiter(object):
+
+    """Token bucket limiting requests and transferred bytes per second.
+
+    Each request takes a token from the request bucket and each transferred
+    byte a token from the byte bucket. Buckets refill at ``requests_per_second``
+    and ``bytes_per_second`` and hold at most ``burst`` seconds worth of
+    tokens. A transfer larger than the bucket is let through and the
+    following transfers wait until the debt is repaid.
+
+    One limiter may be shared between threads. When ``path`` is given, the
+    bucket state is kept in that file under an exclusive lock, so all local
+    processes using the same file share one budget. The file is created if
+    it does not exist; processes sharing it should use the same rates.
+
+    :param requests_per_second: Request rate, unlimited if None
+    :type requests_per_second: float
+    :param bytes_per_second: Upload and download rate, unlimited if None
+    :type bytes_per_second: float
+    :param burst: Bucket size in seconds of rate
+    :type burst: float
+    :param path: State file shared between processes
+    :type path: string
+
+    """
+
+    def __init__(self, requests_per_second=None, bytes_per_second=None, burst=1.0, path=None):
+        if requests_per_second is not None and requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if bytes_per_second is not None and bytes_per_second <= 0:
+            raise ValueError("bytes_per_second must be positive")
+        if burst <= 0:
+            raise ValueError("burst must be positive")
+        if path is not None and fcntl is None:
+            raise ValueError("Rate limiter state file is not supported on this platform")
+
+        self.requests_per_second = requests_per_second
+        self.bytes_per_second = bytes_per_second
+        self.burst = burst
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._file = None
+        self._pid = None
+
+    def acquire(self, requests=1, nbytes=0):
+        """Take tokens from the buckets, wait until they are available.
+
+        :param requests: Number of requests
+        :type requests: int
+        :param nbytes: Number of transferred bytes
+        :type nbytes: int
+        :rtype: float seconds waited
+
+        """
+        delay = self.reserve(requests, nbytes)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def reserve(self, requests=1, nbytes=0):
+        """Take tokens from the buckets and return seconds until they are available."""
+        if self.requests_per_second is None:
+            requests = 0
+        if self.bytes_per_second is None:
+            nbytes = 0
+        if not requests and not nbytes:
+            return 0.
+
+        with self._lock:
+            if self.path is None:
+                self._state, delay = self._take(self._state, requests, nbytes)
+                return delay
+
+            handle = self._open()
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                handle.seek(0)
+                data = handle.read(STATE_SIZE)
+                state, delay = self._take(struct.unpack(STATE_FORMAT, data) if len(data) == STATE_SIZE else None,
+                                          requests, nbytes)
+                handle.seek(0)
+                handle.write(struct.pack(STATE_FORMAT, *state))
+                handle.flush()
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            return delay
+
+    def _open(self):
+        # Locks are held per open file, so a forked process opens its own
+        if self._file is None or self._pid != os.getpid():
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._file = io.open(fd, 'r+b', buffering=0)
+            self._pid = os.getpid()
+        return self._file
+
+    def _take(self, state, requests, nbytes):
+        """Refill buckets, take tokens and return the new state and delay."""
+        now = time.time()
+        if state is None:
+            state = (self._capacity(self.requests_per_second), now, self._capacity(self.bytes_per_second), now)
+
+        request_tokens, request_delay = self._bucket(self.requests_per_second, state[0], state[1], now, requests)
+        byte_tokens, byte_delay = self._bucket(self.bytes_per_second, state[2], state[3], now, nbytes)
+        return (request_tokens, now, byte_tokens, now), max(request_delay, byte_delay)
+
+    def _capacity(self, rate):
+        return rate * self.burst if rate is not None else 0.
+
+    def _bucket(self, rate, tokens, refilled, now, count):
+        if rate is None:
+            return 0., 0.
+
+        # Clock differences between processes must not drain the bucket
+        tokens = min(self._capacity(rate), tokens + rate * max(now - refilled, 0)) - count
+        return tokens, max(-tokens / rate, 0.)
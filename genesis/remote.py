@@ -0,0 +1,154 @@
+"""Remote file"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import io
+import re
+
+import requests
+
+
+BLOCK_SIZE = 1024 * 1024
+CACHE_BLOCKS = 16
+READ_AHEAD = 4
+
+
+class GenRemoteFile(io.RawIOBase):
+
+    """Seekable read-only file on the Genesis platform.
+
+    Bytes are fetched with HTTP Range requests in blocks of ``block_size``
+    bytes. The last ``cache_blocks`` blocks are kept in memory and on
+    sequential reads ``read_ahead`` blocks are fetched with a single
+    request. Wrap the file in :obj:`io.BufferedReader` for line-based
+    reading. Requests are sent with ``session`` when given.
+
+    If the server does not support Range requests and sends the whole file,
+    it is kept in memory and all later reads are served from it.
+
+    """
+
+    def __init__(self, url, auth=None, block_size=BLOCK_SIZE, cache_blocks=CACHE_BLOCKS, read_ahead=READ_AHEAD,
+                 session=None):
+        super(GenRemoteFile, self).__init__()
+        self.url = url
+        self.auth = auth
+        self.session = session
+        self.block_size = block_size
+        self.cache_blocks = max(cache_blocks, read_ahead, 1)
+        self.read_ahead = max(read_ahead, 1)
+
+        self._blocks = collections.OrderedDict()
+        self._content = None
+        self._size = None
+        self._pos = 0
+        self._last_block = None
+
+    @property
+    def size(self):
+        """File size in bytes."""
+        if self._size is None:
+            self._block(0)
+        return self._size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError("Invalid whence {}".format(whence))
+
+        if pos < 0:
+            raise ValueError("Negative seek position {}".format(pos))
+
+        self._pos = pos
+        return self._pos
+
+    def readinto(self, b):
+        view = memoryview(b)
+        count = 0
+        # The size is learned from the first response, fetching block 0 for it would cost a request
+        while count < len(view) and (self._size is None or self._pos < self._size):
+            index, offset = divmod(self._pos, self.block_size)
+            data = self._block(index)[offset:offset + len(view) - count]
+            if not data:
+                break
+
+            view[count:count + len(data)] = data
+            count += len(data)
+            self._pos += len(data)
+
+        return count
+
+    def _block(self, index):
+        """Return a block from the cache or fetch it from the server."""
+        if self._content is not None:
+            return self._content[index * self.block_size:(index + 1) * self.block_size]
+
+        if index in self._blocks:
+            data = self._blocks.pop(index)
+            self._blocks[index] = data
+        else:
+            count = self.read_ahead if self._last_block is not None and index == self._last_block + 1 else 1
+            self._fetch(index, count)
+            if self._content is not None:
+                return self._block(index)
+            data = self._blocks.get(index, b'')
+
+        self._last_block = index
+        return data
+
+    def _fetch(self, index, count):
+        """Fetch ``count`` blocks starting at block ``index``."""
+        start = index * self.block_size
+        end = start + count * self.block_size - 1
+        if self._size is not None:
+            end = min(end, self._size - 1)
+
+        headers = {'Range': 'bytes={}-{}'.format(start, end)}
+        response = (self.session or requests).get(self.url, auth=self.auth, headers=headers)
+        if response.status_code == 416:
+            # Range not satisfiable, position is past the end of file
+            match = re.match(r'bytes \*/(\d+)', response.headers.get('Content-Range', ''))
+            self._size = int(match.group(1)) if match else start
+            return
+
+        response.raise_for_status()
+        content = response.content
+
+        if response.status_code == 206:
+            match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', response.headers.get('Content-Range', ''))
+            if match and match.group(3) != '*':
+                self._size = int(match.group(3))
+            elif self._size is None and len(content) < end - start + 1:
+                self._size = start + len(content)
+        else:
+            # Range requests are not supported, keep the whole file instead of fetching it again
+            self._size = len(content)
+            self._content = content
+            self._blocks.clear()
+            return
+
+        for i in range(count):
+            data = content[i * self.block_size:(i + 1) * self.block_size]
+            if not data:
+                break
+            self._store(index + i, data)
+
+    def _store(self, index, data):
+        self._blocks.pop(index, None)
+        self._blocks[index] = data
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
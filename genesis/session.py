@@ -0,0 +1,196 @@
+"""Session"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+MAX_CACHED_RESPONSES = 256
+MAX_STORED_RESPONSES = 1024
+REVALIDATED_HEADERS = ('cache-control', 'date', 'etag', 'expires', 'last-modified')
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+class GenSession(requests.Session):
+
+    """HTTP session that revalidates cached GET responses.
+
+    Responses of GET requests that carry an ``ETag`` or ``Last-Modified``
+    validator are kept in memory. Repeated requests for the same URL are
+    sent as conditional requests and a ``304 Not Modified`` reply is served
+    from the local copy. Streamed and range requests are not cached.
+
+    Cached responses live only as long as the session, unless a
+    ``cache_dir`` is given: responses are then also stored there, so a new
+    process (e.g. another command line call) revalidates the project and
+    processor lists instead of downloading them again. At most
+    ``max_stored`` responses are kept, least recently stored ones are
+    removed first.
+
+    When a :obj:`GenRateLimiter` is given, every request and the bytes of
+    request bodies and responses are taken from its budget. Streamed
+    responses are charged as their content is iterated.
+
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_RESPONSES, rate_limiter=None, cache_dir=None,
+                 max_stored=MAX_STORED_RESPONSES):
+        super(GenSession, self).__init__()
+        self.max_entries = max_entries
+        self.rate_limiter = rate_limiter
+        self.cache_dir = None if cache_dir is None else os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_stored = max_stored
+        self._responses = collections.OrderedDict()
+        self._responses_lock = threading.Lock()
+
+    def request(self, method, url, params=None, headers=None, **kwargs):  # pylint: disable=arguments-differ
+        if self.rate_limiter is None:
+            return self._request(method, url, params=params, headers=headers, **kwargs)
+
+        data = kwargs.get('data')
+        self.rate_limiter.acquire(nbytes=len(data) if isinstance(data, (bytes, str)) else 0)
+        response = self._request(method, url, params=params, headers=headers, **kwargs)
+        if kwargs.get('stream'):
+            self._limit_stream(response)
+        elif not getattr(response, '_revalidated', False):
+            # The body of a revalidated response was not transferred again
+            self.rate_limiter.acquire(requests=0, nbytes=len(response.content))
+        return response
+
+    def _limit_stream(self, response):
+        """Charge content of a streamed response as it is read."""
+        iter_content = response.iter_content
+        rate_limiter = self.rate_limiter
+
+        def limited_iter_content(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                rate_limiter.acquire(requests=0, nbytes=len(chunk))
+                yield chunk
+
+        # Response.content and iter_lines read through iter_content as well
+        response.iter_content = limited_iter_content
+
+    def _request(self, method, url, params=None, headers=None, **kwargs):
+        headers = CaseInsensitiveDict(headers or {})
+        if method.upper() != 'GET' or kwargs.get('stream') or 'range' in headers:
+            return super(GenSession, self).request(method, url, params=params, headers=headers, **kwargs)
+
+        key = requests.Request('GET', url, params=params).prepare().url
+        with self._responses_lock:
+            cached = self._responses.get(key)
+        if cached is None and self.cache_dir is not None:
+            cached = self._load(key)
+
+        if cached is not None:
+            if 'etag' in cached.headers:
+                headers['If-None-Match'] = cached.headers['etag']
+            if 'last-modified' in cached.headers:
+                headers['If-Modified-Since'] = cached.headers['last-modified']
+
+        response = super(GenSession, self).request(method, url, params=params, headers=headers, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            return self._copy(cached, response)
+
+        if response.status_code == 200 and ('etag' in response.headers or 'last-modified' in response.headers):
+            self._store(key, response)
+
+        return response
+
+    def _store(self, key, response):
+        # Read the content, so the connection is released and the body is kept
+        response.content  # pylint: disable=pointless-statement
+        with self._responses_lock:
+            self._responses.pop(key, None)
+            self._responses[key] = response
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+
+        if self.cache_dir is not None:
+            self._save(key, response)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+    def _load(self, key):
+        """Return a response stored in ``cache_dir`` or ``None``."""
+        try:
+            with open(self._path(key), 'rb') as f:
+                meta = json.loads(f.readline().decode('utf-8'))
+                content = f.read()
+        except (IOError, OSError, ValueError):
+            return None
+
+        if meta.get('key') != key:
+            return None
+
+        response = requests.Response()
+        response.status_code = meta['status_code']
+        response.reason = meta['reason']
+        response.headers = CaseInsensitiveDict(meta['headers'])
+        response.encoding = meta['encoding']
+        response.url = meta['url']
+        response._content = content  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        return response
+
+    def _save(self, key, response):
+        """Store a response in ``cache_dir`` and remove the oldest ones."""
+        meta = {
+            'key': key,
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': dict(response.headers),
+            'encoding': response.encoding,
+            'url': response.url,
+        }
+
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        # Written to a temporary file first, so other processes never read a partial response
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b'\n')
+            f.write(response.content)
+        os.rename(tmp_path, self._path(key))
+
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if not name.startswith('.tmp-')]
+        if len(paths) > self.max_stored:
+            paths.sort(key=_mtime)
+            for path in paths[:len(paths) - self.max_stored]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    # Removed by another process
+                    pass
+
+    @staticmethod
+    def _copy(cached, not_modified):
+        """Return a copy of a cached response for a 304 reply."""
+        response = requests.Response()
+        response.status_code = cached.status_code
+        response.reason = cached.reason
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response.headers.update((h, not_modified.headers[h]) for h in REVALIDATED_HEADERS if h in not_modified.headers)
+        response.encoding = cached.encoding
+        response.url = cached.url
+        response.request = not_modified.request
+        response._content = cached.content  # pylint: disable=protected-access
+        response._content_consumed = True  # pylint: disable=protected-access
+        response._revalidated = True  # pylint: disable=protected-access
+        return response
@@ -0,0 +1,193 @@
+"""Snapshot"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import json
+import mmap
+
+from .data import flatten_annotation
+from .export import BATCH_SIZE
+from .genesis import Genesis
+from .progress import SilentProgress
+from .utils import QUERY_IGNORED, QUERY_LOOKUPS, match_query
+
+
+MAGIC = b'GENESIS-SNAPSHOT 1\n'
+INDEX_OFFSET_SIZE = 20
+
+# Fields of data objects kept in the index, so common queries need not decode records
+INDEXED_FIELDS = ('id', 'case_ids', 'status', 'type', 'processor_name')
+
+
+def write_snapshot(gen, path, projects=None):
+    """Write projects, their data objects and processors to a snapshot file.
+
+    Data objects are streamed to the file page by page. Objects referenced
+    from project data are included, so references can be hydrated offline.
+
+    The file starts with a magic line, followed by one JSON line per data
+    object, a JSON index line with projects, processors and data object
+    offsets and filter fields, and the offset of the index line.
+
+    :param gen: Online Genesis client
+    :type gen: :obj:`Genesis`
+    :param path: Snapshot file path
+    :type path: string
+    :param projects: ObjectIds or slugs of projects, all projects by default
+    :type projects: list of strings
+
+    """
+    all_projects = gen._fetch_projects()  # pylint: disable=protected-access
+    if projects is None:
+        project_ids = [p['id'] for p in all_projects]
+    else:
+        project_ids = [gen._project_id(p) for p in projects]  # pylint: disable=protected-access
+
+    index = {
+        'projects': [p for p in all_projects if p['id'] in project_ids],
+        'processors': gen.processors(),
+        'project_data': {},
+        'data': {},
+    }
+
+    with io.open(path, 'wb') as f:
+        f.write(MAGIC)
+
+        def write_data(d):
+            if d['id'] in index['data']:
+                return
+
+            record = json.dumps(d).encode('utf-8') + b'\n'
+            index['data'][d['id']] = [f.tell(), len(record), _summary(d)]
+            f.write(record)
+
+        references = set()
+        for project_id in project_ids:
+            index['project_data'][project_id] = []
+            for d in gen._iter_raw_data(BATCH_SIZE, case_ids__contains=project_id):  # pylint: disable=protected-access
+                index['project_data'][project_id].append(d['id'])
+                references.update(_references(d))
+                write_data(d)
+
+        references -= set(index['data'])
+        while references:
+            found = list(gen._data_by_ids(sorted(references)))  # pylint: disable=protected-access
+            for d in found:
+                write_data(d)
+            references = set(r for d in found for r in _references(d)) - set(index['data'])
+
+        offset = f.tell()
+        f.write(json.dumps(index).encode('utf-8') + b'\n')
+        f.write('{:0{}d}\n'.format(offset, INDEX_OFFSET_SIZE).encode('ascii'))
+
+
+def _summary(data):
+    """Return indexed fields of a raw data object."""
+    summary = {f: data[f] for f in INDEXED_FIELDS if f in data}
+    static = data.get('static') or {}
+    if 'name' in static:
+        summary['static'] = {'name': static['name']}
+    return summary
+
+
+def _is_indexed(query):
+    """Check if a query filters only on indexed fields."""
+    for key in query:
+        if key in QUERY_IGNORED:
+            continue
+
+        parts = key.split('__')
+        if len(parts) > 1 and parts[-1] in QUERY_LOOKUPS:
+            parts.pop()
+
+        if not (len(parts) == 1 and parts[0] in INDEXED_FIELDS or parts == ['static', 'name']):
+            return False
+
+    return True
+
+
+def _references(data):
+    """Return ids of data objects referenced from a raw data object."""
+    return set(ann['value'] for ann in flatten_annotation(data).values()
+               if ann['type'].startswith('data:') and ann['value'])
+
+
+class OfflineGenesis(Genesis):
+
+    """Read-only Genesis client backed by a snapshot file.
+
+    The snapshot is memory-mapped and data objects are decoded only when
+    they are accessed. Queries on ``id``, ``case_ids``, ``status``, ``type``,
+    ``processor_name`` and ``static.name`` are matched against the index
+    and decode only matching objects. Create snapshots with
+    :meth:`Genesis.snapshot`.
+    Methods that change data or transfer files are not available.
+
+    """
+
+    def __init__(self, path, processes=None):  # pylint: disable=super-init-not-called
+        self._setup(None, None, None, progress=SilentProgress(), processes=processes)
+
+        with io.open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError("Not a Genesis snapshot: {}".format(path))
+
+        offset = int(self._mmap[-INDEX_OFFSET_SIZE - 1:-1])
+        self._index = json.loads(self._mmap[offset:-INDEX_OFFSET_SIZE - 1].decode('utf-8'))
+
+    def close(self):
+        """Close the snapshot file and stop the process pool."""
+        super(OfflineGenesis, self).close()
+        self._mmap.close()
+
+    def _record(self, data_id):
+        offset, length = self._index['data'][data_id][:2]
+        return json.loads(self._mmap[offset:offset + length].decode('utf-8'))
+
+    def _fetch_projects(self, **query):
+        return [p for p in self._index['projects'] if match_query(p, query)]
+
+    def _fetch_project_data(self, project_id):
+        return [self._record(_id) for _id in self._index['project_data'].get(project_id, [])]
+
+    def _matching(self, query):
+        """Return ids of indexed objects matching a query, or None if the query is not indexed."""
+        if not _is_indexed(query):
+            return None
+        return [_id for _id, entry in self._index['data'].items() if match_query(entry[2], query)]
+
+    def _fetch_data(self, **query):
+        return list(self._iter_raw_data(None, **query))
+
+    def _query_ids(self, **query):
+        ids = self._matching(query)
+        if ids is None:
+            return set(d['id'] for d in self._fetch_data(**query))
+        return set(ids)
+
+    def _iter_raw_data(self, page_size, **query):
+        ids = self._matching(query)
+        if ids is not None:
+            for _id in ids:
+                yield self._record(_id)
+            return
+
+        for _id in self._index['data']:
+            d = self._record(_id)
+            if match_query(d, query):
+                yield d
+
+    def _data_by_ids(self, data_ids):
+        for _id in data_ids:
+            if _id in self._index['data']:
+                yield self._record(_id)
+
+    def _load_processors(self, **query):
+        return [p for p in self._index['processors'] if match_query(p, query)]
+
+    def _read_only(self, *args, **kwargs):
+        raise RuntimeError("Genesis snapshot is read-only and offline")
+
+    create = upload = rundata = wait = download = download_files = open = snapshot = _read_only
@@ -0,0 +1,166 @@
+"""Store"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+
+
+class GenStore(object):
+
+    """Content-addressed local store of downloaded files.
+
+    Files are stored under ``<path>/<key[:2]>/<key>`` and are keyed by the
+    data object checksum and the file field. When ``max_size`` is set, least
+    recently used files are evicted once the store grows beyond it.
+
+    """
+
+    def __init__(self, path, max_size=None):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.max_size = max_size
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+    @staticmethod
+    def key(checksum, field):
+        """Return the store key of a file field.
+
+        :param checksum: Data object checksum
+        :type checksum: string
+        :param field: File field name
+        :type field: string
+        :rtype: string
+
+        """
+        return '{}-{}'.format(checksum, field)
+
+    def _path(self, key):
+        return os.path.join(self.path, key[:2], key)
+
+    def get(self, key):
+        """Return the path of a stored file or ``None`` if it is missing.
+
+        :param key: Store key
+        :type key: string
+        :rtype: string
+
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            return None
+
+        # Mark as recently used
+        os.utime(path, None)
+        return path
+
+    def open(self, key):
+        """Return a file handle of a stored file or ``None`` if it is missing.
+
+        :param key: Store key
+        :type key: string
+        :rtype: a file handle
+
+        """
+        path = self.get(key)
+        return open(path, 'rb') if path else None
+
+    def put(self, key, chunks):
+        """Store a file and return its path.
+
+        The file is written to a temporary file first and moved into the
+        store when complete, so partial downloads are never served.
+
+        :param key: Store key
+        :type key: string
+        :param chunks: File content
+        :type chunks: iterable of bytes
+        :rtype: string
+
+        """
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.rename(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self.evict(keep=path)
+        return path
+
+    def link(self, key, dest):
+        """Hard link a stored file to ``dest``.
+
+        The file is copied if hard links are not supported (e.g. ``dest`` is
+        on another file system).
+
+        :param key: Store key
+        :type key: string
+        :param dest: Destination path
+        :type dest: string
+        :rtype: bool
+
+        """
+        path = self.get(key)
+        if path is None:
+            return False
+
+        try:
+            os.link(path, dest)
+        except (OSError, AttributeError):
+            shutil.copyfile(path, dest)
+
+        return True
+
+    def size(self):
+        """Return the total size of stored files in bytes."""
+        return sum(size for _, _, size in self._files())
+
+    def evict(self, keep=None):
+        """Remove least recently used files until the store fits ``max_size``.
+
+        :param keep: Path of a file that must not be evicted
+        :type keep: string
+
+        """
+        if self.max_size is None:
+            return
+
+        files = sorted(self._files())
+        total = sum(size for _, _, size in files)
+        for _, path, size in files:
+            if total <= self.max_size:
+                break
+
+            if path == keep:
+                continue
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            total -= size
+
+    def _files(self):
+        """Return (mtime, path, size) of all stored files."""
+        files = []
+        for root, _, names in os.walk(self.path):
+            for name in names:
+                if name.startswith('.tmp-'):
+                    continue
+
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, path, stat.st_size))
+
+        return files
@@ -0,0 +1,103 @@
+"""Helpers for tests that run without a Genesis server"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import copy
+import threading
+
+try:
+    from unittest import mock
+except ImportError:  # Python 2
+    import mock
+
+from genesis import genesis as genesis_module
+from genesis.progress import SilentProgress
+from genesis.utils import match_query
+
+
+def object_id(number):
+    """Return a valid ObjectId for a number."""
+    return '{:024x}'.format(number)
+
+
+def raw_data(number, refs=(), status='done', case_ids=(), processor_name='test:processor', output=None):
+    """Return a raw data object with a name and ``refs`` as data inputs."""
+    _id = object_id(number)
+    return {
+        'id': _id,
+        'status': status,
+        'type': 'data:test:',
+        'persistence': 'RAW',
+        'date_start': None,
+        'date_finish': None,
+        'date_created': '2018-01-01T00:00:00',
+        'date_modified': '2018-01-01T00:00:00',
+        'checksum': 'checksum-{}'.format(_id),
+        'processor_name': processor_name,
+        'case_ids': list(case_ids),
+        'input': {'ref{}'.format(i): ref for i, ref in enumerate(refs)},
+        'input_schema': [{'name': 'ref{}'.format(i), 'type': 'data:test:', 'label': 'Ref'} for i in range(len(refs))],
+        'output': output or {},
+        'output_schema': [{'name': name, 'type': 'basic:string:', 'label': name} for name in sorted(output or {})],
+        'static': {'name': 'data {}'.format(number)},
+        'static_schema': [{'name': 'name', 'type': 'basic:string:', 'label': 'Name'}],
+        'var': {},
+        'var_template': [],
+    }
+
+
+class FakeResource(object):
+
+    """Slumber-like API resource serving objects from a list."""
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def __call__(self, _id):
+        resource = self
+
+        class Detail(object):
+
+            def get(self):
+                return copy.deepcopy(next(o for o in resource.objects if o['id'] == _id))
+
+        return Detail()
+
+    def get(self, **query):
+        with self._lock:
+            self.queries.append(query)
+
+        found = [copy.deepcopy(o) for o in self.objects if match_query(o, query)]
+        offset = int(query.get('offset', 0))
+        limit = int(query.get('limit', 0)) or len(found)
+        page = found[offset:offset + limit]
+        fields = query.get('fields')
+        if fields:
+            page = [{k: v for k, v in o.items() if k in fields.split(',')} for o in page]
+
+        return {
+            'meta': {'next': 'next' if offset + limit < len(found) else None},
+            'objects': page,
+        }
+
+
+class FakeApi(object):
+
+    """Slumber-like API of a Genesis server."""
+
+    def __init__(self, data=(), projects=(), processors=()):
+        self.data = FakeResource(list(data))
+        self.dataid = self.data
+        self.case = FakeResource(list(projects))
+        self.processor = FakeResource(list(processors))
+
+
+def make_genesis(data=(), projects=(), processors=(), **kwargs):
+    """Return a :obj:`Genesis` client backed by a :obj:`FakeApi`."""
+    kwargs.setdefault('progress', SilentProgress())
+    with mock.patch.object(genesis_module, 'GenAuth'):
+        gen = genesis_module.Genesis('user@example.com', 'password', 'http://genesis.test/', **kwargs)
+
+    gen.api = FakeApi(data, projects, processors)
+    return gen
@@ -0,0 +1,94 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import sys
+import unittest
+
+import requests
+
+from genesis import cli
+from genesis import genesis as genesis_module
+from genesis.tests.base import make_genesis, mock, object_id, raw_data
+
+
+class TestSplitPipeline(unittest.TestCase):
+
+    def test_split(self):
+        self.assertEqual(cli._split_pipeline(['query', 'status=done', '+', 'wait', '+', 'download', 'output.exp']),
+                         [['query', 'status=done'], ['wait'], ['download', 'output.exp']])
+        self.assertEqual(cli._split_pipeline(['query']), [['query']])
+        self.assertEqual(cli._split_pipeline([]), [[]])
+
+    def test_filters(self):
+        self.assertEqual(cli._filters(['status=done', 'static__name=a=b']), {'status': 'done', 'static__name': 'a=b'})
+        with self.assertRaises(ValueError):
+            cli._filters(['status'])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        data = [raw_data(1, case_ids=[object_id(100)]), raw_data(2, status='error')]
+        self.gen = make_genesis(data, projects=[{'id': object_id(100), 'url_slug': 'project'}])
+        self.clients = []
+
+        def client(*args, **kwargs):
+            self.clients.append((args, kwargs))
+            return self.gen
+
+        self.stdout = io.StringIO()
+        self.stderr = io.StringIO()
+        for patcher in (mock.patch.object(genesis_module, 'Genesis', side_effect=client),
+                        mock.patch.object(sys, 'stdout', self.stdout),
+                        mock.patch.object(sys, 'stderr', self.stderr)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_global_options(self):
+        self.assertEqual(cli.main(['-a', 'http://genesis.test/', '-e', 'me@example.com', '-p', 'secret',
+                                   '--max-requests', '5', '--http-cache', 'cache', 'query', 'status=done']), 0)
+
+        (args, kwargs), = self.clients
+        self.assertEqual(args, ('me@example.com', 'secret', 'http://genesis.test/'))
+        self.assertEqual(kwargs['rate_limiter'].requests_per_second, 5)
+        self.assertEqual(kwargs['http_cache'], 'cache')
+        self.assertEqual(self.stdout.getvalue().split('\t')[0], object_id(1))
+
+    def test_pipeline_passes_ids(self):
+        self.assertEqual(cli.main(['--timing', 'query', '+', 'wait', '--timeout', '1']), 0)
+
+        self.assertEqual(len(self.clients), 1)
+        lines = self.stdout.getvalue().splitlines()
+        self.assertEqual(lines[2:], ['{}\tdone'.format(object_id(1)), '{}\terror'.format(object_id(2))])
+        self.assertIn('[timing] wait:', self.stderr.getvalue())
+        self.assertIsNone(self.clients[0][1]['rate_limiter'])
+
+    def test_upload_to_project_slug(self):
+        response = requests.Response()
+        response.status_code = 201
+        response._content = '{{"id": "{}"}}'.format(object_id(3)).encode('utf-8')  # pylint: disable=protected-access
+
+        with mock.patch.object(self.gen, 'upload', return_value=response) as upload:
+            self.assertEqual(cli.main(['upload', 'project', '-r', 'a.fq']), 0)
+            self.assertEqual(cli.main(['batch-upload', 'project', '-r1', 'a_1.fq', '-r2', 'a_2.fq']), 0)
+
+        self.assertEqual([c[0][0] for c in upload.call_args_list], [object_id(100)] * 2)
+        self.assertEqual(self.stdout.getvalue().splitlines(), [object_id(3)] * 2)
+        self.assertEqual(cli.main(['upload', 'missing', '-r', 'a.fq']), 1)
+
+    def test_errors(self):
+        self.assertEqual(cli.main(['download', 'output.exp']), 1)
+        self.assertIn('No data objects to download', self.stderr.getvalue())
+        self.assertEqual(cli.main(['upload', object_id(100), '-r', 'a.fq', '-r1', 'b.fq']), 1)
+        self.assertEqual(cli.main(['query', 'status']), 1)
+
+    def test_usage_errors_do_not_sign_in(self):
+        with self.assertRaises(SystemExit):
+            cli.main(['query', '+', 'unknown'])
+        with self.assertRaises(SystemExit):
+            cli.main([])
+        self.assertEqual(self.clients, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
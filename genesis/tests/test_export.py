@@ -0,0 +1,103 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+
+from genesis.data import GenData
+from genesis.export import export_annotation, select_columns
+from genesis.tests.base import raw_data
+
+
+class TestSelectColumns(unittest.TestCase):
+
+    paths = ['static.name', 'output.exp', 'output.rc', 'input.ref0']
+
+    def test_all_columns(self):
+        self.assertEqual(select_columns(None, self.paths + ['id', 'name']),
+                         ['id', 'name', 'input.ref0', 'output.exp', 'output.rc', 'static.name'])
+
+    def test_paths_and_prefixes(self):
+        self.assertEqual(select_columns(['output', 'static.name'], self.paths),
+                         ['id', 'output.exp', 'output.rc', 'static.name'])
+        self.assertEqual(select_columns(['name', 'id'], self.paths), ['name', 'id'])
+        self.assertEqual(select_columns(['missing'], self.paths), ['id', 'missing'])
+
+
+class TestExportAnnotation(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        first = [GenData(raw_data(i, output={'exp': i}), None) for i in range(3)]
+        other = [GenData(raw_data(i, output={'exp': i, 'rc': -i}, processor_name='other'), None) for i in range(3, 5)]
+        self.data = first + other
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def read_csv(self, path):
+        with io.open(path, newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def read_jsonl(self, path):
+        with io.open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_csv_columns(self):
+        path = os.path.join(self.path, 'data.csv')
+        self.assertEqual(export_annotation(self.data, path, columns=['output.exp', 'output.rc'], batch_size=2), 5)
+
+        rows = self.read_csv(path)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(list(rows[0]), ['id', 'output.exp', 'output.rc'])
+        self.assertEqual(rows[0]['output.rc'], '')
+        self.assertEqual(rows[4]['output.rc'], '-4')
+
+    def test_csv_warns_about_later_columns(self):
+        path = os.path.join(self.path, 'data.csv')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            export_annotation(self.data, path, batch_size=2)
+
+        self.assertEqual(len(caught), 1)
+        self.assertIn('output.rc', str(caught[0].message))
+        self.assertNotIn('output.rc', self.read_csv(path)[0])
+
+    def test_jsonl_keeps_later_columns(self):
+        path = os.path.join(self.path, 'data.jsonl')
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            export_annotation(self.data, path, batch_size=2)
+
+        rows = self.read_jsonl(path)
+        self.assertEqual(caught, [])
+        self.assertNotIn('output.rc', rows[0])
+        self.assertEqual(rows[4]['output.rc'], -4)
+        self.assertEqual(rows[4]['static.name'], 'data 4')
+
+    def test_jsonl_columns(self):
+        path = os.path.join(self.path, 'data.jsonl')
+        export_annotation(self.data, path, columns=['output'], batch_size=2)
+
+        # Prefixes are resolved for every row
+        rows = self.read_jsonl(path)
+        self.assertEqual(sorted(rows[0]), ['id', 'output.exp'])
+        self.assertEqual(sorted(rows[4]), ['id', 'output.exp', 'output.rc'])
+
+    def test_empty(self):
+        path = os.path.join(self.path, 'data.csv')
+        self.assertEqual(export_annotation([], path), 0)
+        self.assertEqual(self.read_csv(path), [])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export_annotation(self.data, os.path.join(self.path, 'data.xls'))
+
+
+if __name__ == '__main__':
+    unittest.main()
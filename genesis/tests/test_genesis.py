@@ -0,0 +1,312 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import threading
+import time
+import unittest
+
+from genesis import data as data_module
+from genesis import genesis as genesis_module
+from genesis.data import SCHEMA_FIELDS, annotation_values, flatten_annotation
+from genesis.tests.base import make_genesis, mock, object_id, raw_data
+
+
+class TestWait(unittest.TestCase):
+
+    def test_wait_keeps_references_hydrated(self):
+        project = object_id(100)
+        data = [raw_data(1, case_ids=[project], output={'exp': 'e'}),
+                raw_data(2, refs=[object_id(1)], status='processing', case_ids=[project])]
+        gen = make_genesis(data)
+
+        d = [o for o in gen.project_data(project) if o.id == object_id(2)][0]
+        self.assertEqual(d.annotation['input.ref0.output.exp']['value'], 'e')
+
+        data[1]['status'] = 'done'
+        completed = list(gen.wait([object_id(2)], interval=0))
+
+        self.assertEqual([o.id for o in completed], [object_id(2)])
+        self.assertIs(completed[0], d)
+        self.assertEqual(d.status, 'done')
+        self.assertEqual(d.annotation['input.ref0.output.exp']['value'], 'e')
+        self.assertNotIn('input.ref0', d.annotation)
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        self.projects = [object_id(100), object_id(101)]
+        data = [raw_data(1),
+                raw_data(2, refs=[object_id(1)], case_ids=[self.projects[0]]),
+                raw_data(3, refs=[object_id(1)], case_ids=[self.projects[1]]),
+                raw_data(4, refs=[object_id(1)], case_ids=self.projects)]
+        projects = [{'id': p, 'name': 'Project {}'.format(i)} for i, p in enumerate(self.projects)]
+        self.gen = make_genesis(data, projects)
+
+    def test_shared_objects_are_loaded_once(self):
+        loaded = self.gen.prefetch()
+        queries = self.gen.api.data.queries
+
+        self.assertEqual(sorted(loaded), self.projects)
+        self.assertEqual(sorted(q['case_ids__contains'] for q in queries if 'case_ids__contains' in q), self.projects)
+        # The object referenced from both projects is fetched with a single query
+        self.assertEqual([q['id__in'] for q in queries if 'id__in' in q], [object_id(1)])
+
+        shared = [[d for d in loaded[p] if d.id == object_id(4)][0] for p in self.projects]
+        self.assertIs(shared[0], shared[1])
+        self.assertEqual(shared[0].annotation['input.ref0.static.name']['value'], 'data 1')
+
+    def test_loaded_projects_are_not_fetched_again(self):
+        self.gen.project_data(self.projects[0])
+        count = len(self.gen.api.data.queries)
+
+        loaded = self.gen.prefetch(self.projects)
+        self.assertEqual(self.gen.project_data(self.projects[0]), loaded[self.projects[0]])
+        self.assertEqual([q.get('case_ids__contains') for q in self.gen.api.data.queries[count:]],
+                         [self.projects[1]])
+
+
+class TestHydrate(unittest.TestCase):
+
+    def hydrate(self, data, order):
+        gen = make_genesis(data)
+        data_objects = gen._add_data([data[i] for i in order])  # pylint: disable=protected-access
+        gen._hydrate(data_objects)  # pylint: disable=protected-access
+        return {d.id: d.annotation for d in data_objects}
+
+    def test_references(self):
+        data = [raw_data(0), raw_data(1, refs=[object_id(0)]), raw_data(2, refs=[object_id(1), object_id(0)])]
+        annotation = self.hydrate(data, [2, 1, 0])[object_id(2)]
+
+        self.assertEqual(annotation['input.ref0.input.ref0.static.name']['value'], 'data 0')
+        self.assertEqual(annotation['input.ref1.static.name']['value'], 'data 0')
+        self.assertEqual(annotation['static.name']['value'], 'data 2')
+
+    def test_cycle(self):
+        data = [raw_data(0, refs=[object_id(1)]), raw_data(1, refs=[object_id(0)])]
+        annotations = self.hydrate(data, [0, 1])
+
+        self.assertEqual(annotations, self.hydrate(data, [1, 0]))
+        for number, other in ((0, 1), (1, 0)):
+            annotation = annotations[object_id(number)]
+            self.assertEqual(annotation['input.ref0.static.name']['value'], 'data {}'.format(other))
+            # The cycle is cut where it returns to the object
+            self.assertEqual(annotation['input.ref0.input.ref0']['value'], object_id(number))
+            self.assertNotIn('input.ref0.input.ref0.static.name', annotation)
+
+    def test_self_reference(self):
+        annotation = self.hydrate([raw_data(0, refs=[object_id(0)])], [0])[object_id(0)]
+        self.assertEqual(annotation['input.ref0']['value'], object_id(0))
+
+    def test_depth(self):
+        depth = genesis_module.MAX_REFERENCE_DEPTH + 3
+        data = [raw_data(0)] + [raw_data(i, refs=[object_id(i - 1)]) for i in range(1, depth)]
+        deep_first = self.hydrate(data, range(depth))
+        shallow_first = self.hydrate(data, reversed(range(depth)))
+
+        self.assertEqual(deep_first, shallow_first)
+        # Objects close to the end of the chain are fully expanded
+        self.assertEqual(deep_first[object_id(2)]['input.ref0.input.ref0.static.name']['value'], 'data 0')
+
+        # The longest chain is cut at the depth limit
+        top = deep_first[object_id(depth - 1)]
+        prefix = '.'.join(['input.ref0'] * genesis_module.MAX_REFERENCE_DEPTH)
+        self.assertEqual(top[prefix + '.static.name']['value'], 'data 2')
+        self.assertEqual(top[prefix + '.input.ref0']['value'], object_id(1))
+
+
+class TestDownload(unittest.TestCase):
+
+    def setUp(self):
+        data = []
+        for i in range(5):
+            d = raw_data(i, output={'exp': {'file': 'expression{}.tab'.format(i)}})
+            d['output_schema'] = [{'name': 'exp', 'type': 'basic:file:', 'label': 'Expression'}]
+            data.append(d)
+        self.gen = make_genesis(data)
+        self.ids = [object_id(i) for i in range(5)]
+
+        for patcher in (mock.patch.object(genesis_module, 'QUERY_CHUNK_SIZE', 2),
+                        mock.patch.object(self.gen, '_download', side_effect=lambda obj, field: obj.id)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def queried_ids(self):
+        return [q['id__in'].split(',') for q in self.gen.api.data.queries if 'id__in' in q]
+
+    def test_objects_are_resolved_in_chunks(self):
+        self.assertEqual(list(self.gen.download(self.ids, 'output.exp')), self.ids)
+        self.assertEqual(self.queried_ids(), [self.ids[:2], self.ids[2:4], self.ids[4:]])
+
+    def test_only_next_chunk_is_resolved_ahead(self):
+        responses = self.gen.download(self.ids, 'output.exp')
+        self.assertEqual(next(responses), self.ids[0])
+        responses.close()
+        # Give a background worker time to resolve chunks nobody asked for
+        time.sleep(0.1)
+
+        # The next chunk may have been resolved, later ones are not
+        self.assertIn(self.queried_ids(), ([self.ids[:2]], [self.ids[:2], self.ids[2:4]]))
+
+
+class TestSparseData(unittest.TestCase):
+
+    def setUp(self):
+        data = [raw_data(1, output={'exp': 'e', 'rc': 'r'}),
+                raw_data(2, refs=[object_id(1)], processor_name='test:reference')]
+        processors = [dict({f: d[f] for f in SCHEMA_FIELDS}, name=d['processor_name']) for d in data]
+        self.gen = make_genesis(data, processors=processors)
+
+    def test_sparse_data(self):
+        d = self.gen.data(fields=['output.exp'], id=object_id(1))[0]
+
+        self.assertEqual(d.annotation['output.exp']['value'], 'e')
+        self.assertEqual(d.annotation['static.name']['value'], 'data 1')
+        self.assertNotIn('input', self.gen.api.data.queries[0]['fields'].split(','))
+        self.assertIsNone(d.date_created)
+
+    def test_unrequested_fields_are_left_out(self):
+        d = self.gen.data(fields=['output.exp'], id=object_id(2))[0]
+
+        # The reference was not requested, it is neither shown as null nor hydrated
+        self.assertIsNone(d.input_schema)
+        self.assertEqual(sorted(d.annotation), ['static.name'])
+
+    def test_sparse_data_is_not_cached(self):
+        full = self.gen.data(id=object_id(1))[0]
+        sparse = self.gen.data(fields=['input'])
+
+        self.assertNotIn(full, sparse)
+        self.assertEqual(full.date_created, '2018-01-01T00:00:00')
+        self.assertEqual(full.annotation['output.rc']['value'], 'r')
+        self.assertIs(self.gen.data(id=object_id(1))[0], full)
+        # References of partial objects are hydrated with full objects
+        ref = [d for d in sparse if d.id == object_id(2)][0]
+        self.assertEqual(ref.annotation['input.ref0.output.exp']['value'], 'e')
+
+
+class TestThreads(unittest.TestCase):
+
+    def test_references_are_fetched_concurrently(self):
+        projects = [object_id(100), object_id(101)]
+        data = [raw_data(1), raw_data(2),
+                raw_data(3, refs=[object_id(1)], case_ids=[projects[0]]),
+                raw_data(4, refs=[object_id(2)], case_ids=[projects[1]])]
+        gen = make_genesis(data)
+
+        get = gen.api.data.get
+        fetching = []
+        overlapped = []
+        both = threading.Event()
+
+        def get_references(**query):
+            if 'id__in' in query:
+                fetching.append(query['id__in'])
+                if len(fetching) == 2:
+                    both.set()
+                # Waits until the other thread fetches its references, unless it is blocked
+                overlapped.append(both.wait(2))
+            return get(**query)
+
+        gen.api.data.get = get_references
+        threads = [threading.Thread(target=gen.project_data, args=(p,)) for p in projects]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(overlapped, [True, True])
+        for project, ref in zip(projects, ['data 1', 'data 2']):
+            self.assertEqual(gen.project_data(project)[0].annotation['input.ref0.static.name']['value'], ref)
+
+    def test_annotation_is_flattened_without_lock(self):
+        gen = make_genesis()
+        locked = []
+
+        def flatten(data):
+            locked.append(gen._lock._is_owned())  # pylint: disable=protected-access
+            return annotation_values(data)
+
+        with mock.patch.object(genesis_module, 'annotation_values', side_effect=flatten):
+            gen._add_data([raw_data(1), raw_data(2)])  # pylint: disable=protected-access
+        self.assertEqual(locked, [False, False])
+
+    def test_shared_references_are_fetched_once(self):
+        projects = [object_id(100), object_id(101)]
+        data = [raw_data(1),
+                raw_data(2, refs=[object_id(1)], case_ids=[projects[0]]),
+                raw_data(3, refs=[object_id(1)], case_ids=[projects[1]])]
+        gen = make_genesis(data)
+
+        get = gen.api.data.get
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def get_references(**query):
+            if 'id__in' in query:
+                fetching.set()
+                release.wait(5)
+            return get(**query)
+
+        gen.api.data.get = get_references
+        threads = [threading.Thread(target=gen.project_data, args=(projects[0],))]
+        threads[0].start()
+        fetching.wait(5)
+        threads.append(threading.Thread(target=gen.project_data, args=(projects[1],)))
+        threads[1].start()
+        # Let the second thread reach the references in flight
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual([q['id__in'] for q in gen.api.data.queries if 'id__in' in q], [object_id(1)])
+        for project in projects:
+            self.assertEqual(gen.project_data(project)[0].annotation['input.ref0.static.name']['value'], 'data 1')
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_flatten_parallel(self):
+        data = [raw_data(i, refs=[object_id(0)], output={'exp': i}) for i in range(20)]
+        data += [raw_data(i, output={'rc': i}, processor_name='other') for i in range(20, 30)]
+        gen = make_genesis(processes=2)
+        self.addCleanup(gen.close)
+
+        with mock.patch.object(genesis_module, 'PARALLEL_MIN_OBJECTS', 10):
+            data_objects = gen._add_data(data)  # pylint: disable=protected-access
+            pool = gen._pool  # pylint: disable=protected-access
+            gen._add_data(data[:10])  # pylint: disable=protected-access
+
+        # One pool is reused by the client
+        self.assertIsNotNone(pool)
+        self.assertIs(gen._pool, pool)  # pylint: disable=protected-access
+        for d, raw in zip(data_objects, data):
+            self.assertEqual(d.annotation, flatten_annotation(raw))
+
+        gen.close()
+        self.assertIsNone(gen._pool)  # pylint: disable=protected-access
+
+
+class TestLazyAnnotation(unittest.TestCase):
+
+    def test_annotation_is_built_on_first_use(self):
+        gen = make_genesis([raw_data(1, output={'exp': 'e'}), raw_data(2, refs=[object_id(1)]), raw_data(3)])
+        build_annotation = data_module.annotation_from_values
+        with mock.patch.object(data_module, 'annotation_from_values', wraps=build_annotation) as build:
+            data_objects = gen.data()
+            # Only objects that take part in expanding references are built
+            self.assertEqual(build.call_count, 2)
+            self.assertEqual(data_objects[1].annotation['input.ref0.output.exp']['value'], 'e')
+
+            self.assertEqual(data_objects[2].annotation['static.name']['value'], 'data 3')
+            self.assertEqual(data_objects[2].annotation['static.name']['value'], 'data 3')
+            self.assertEqual(build.call_count, 3)
+
+            # Updated objects are built again
+            gen.data(id=object_id(3))
+            self.assertEqual(data_objects[2].annotation['static.name']['value'], 'data 3')
+            self.assertEqual(build.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
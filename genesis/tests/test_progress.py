@@ -0,0 +1,142 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import logging
+import unittest
+
+from genesis import LoggingProgress, Progress, TerminalProgress
+from genesis import progress as progress_module
+from genesis.tests.base import mock
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.
+
+    def time(self):
+        return self.now
+
+
+class RecordingProgress(Progress):
+
+    def __init__(self, interval=1.0):
+        super(RecordingProgress, self).__init__(interval)
+        self.rendered = []
+
+    def render(self, stats):
+        self.rendered.append(stats)
+
+
+class ProgressTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(progress_module.time, 'time', self.clock.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestProgress(ProgressTestCase):
+
+    def test_transfers_are_aggregated(self):
+        progress = RecordingProgress()
+        first = progress.start('a.fq', 100)
+        second = progress.start('b.fq', 300)
+        self.clock.now += 2
+        progress.update(first, 50)
+        progress.update(second, 150)
+
+        stats = progress.stats()
+        self.assertEqual(stats['names'], ['a.fq', 'b.fq'])
+        self.assertEqual((stats['done'], stats['total']), (200, 400))
+        self.assertEqual(stats['rate'], 100)
+        self.assertEqual(stats['eta'], 2)
+        self.assertFalse(stats['finished'])
+
+    def test_unknown_total(self):
+        progress = RecordingProgress()
+        transfer = progress.start('a.fq')
+        progress.start('b.fq', 100)
+        progress.update(transfer, 10)
+        self.assertIsNone(progress.stats()['total'])
+        self.assertIsNone(progress.stats()['eta'])
+
+        # The total of a finished transfer is what was transferred
+        progress.finish(transfer)
+        self.assertEqual(progress.rendered[-1]['total'], 110)
+
+    def test_rendering_is_rate_limited(self):
+        progress = RecordingProgress(interval=1.0)
+        transfer = progress.start('a.fq', 100)
+
+        for _ in range(5):
+            progress.update(transfer, 10)
+        self.assertEqual(len(progress.rendered), 1)
+
+        self.clock.now += 1
+        progress.update(transfer, 10)
+        self.assertEqual(len(progress.rendered), 2)
+        self.assertEqual(progress.rendered[-1]['done'], 60)
+
+        # The final state is always rendered
+        progress.finish(transfer)
+        self.assertEqual(len(progress.rendered), 3)
+        self.assertTrue(progress.rendered[-1]['finished'])
+
+    def test_finished_transfers_are_removed(self):
+        progress = RecordingProgress()
+        first = progress.start('a.fq', 10)
+        second = progress.start('b.fq', 10)
+        progress.finish(first)
+        self.assertEqual(progress.stats()['names'], ['a.fq', 'b.fq'])
+
+        progress.finish(second)
+        self.assertEqual(progress.stats()['names'], [])
+
+    def test_describe(self):
+        stats = {'names': ['a.fq'], 'done': 1500, 'total': 3000, 'rate': 500., 'eta': 3, 'finished': False}
+        self.assertEqual(Progress.describe(stats), '50 % 1.5 kB 500.0 B/s ETA 0:00:03 a.fq')
+
+        stats.update(names=['a.fq', 'b.fq'], total=None, eta=None)
+        self.assertEqual(Progress.describe(stats), '1.5 kB 500.0 B/s 2 transfers')
+
+
+class TestTerminalProgress(ProgressTestCase):
+
+    def test_single_line(self):
+        stream = io.StringIO()
+        progress = TerminalProgress(stream=stream)
+        transfer = progress.start('reads.fq', 2000)
+        self.clock.now += 1
+        progress.update(transfer, 1000)
+        progress.finish(transfer)
+
+        lines = stream.getvalue().split('\r')
+        self.assertEqual(lines[0], '')
+        self.assertTrue(lines[1].startswith('50 % 1.0 kB'))
+        self.assertIn('ETA', lines[1])
+        # The shorter final line is padded to overwrite the previous one and ended
+        self.assertNotIn('ETA', lines[2])
+        self.assertTrue(lines[2].endswith(' \n'))
+        self.assertEqual(len(lines[2]), len(lines[1]) + 1)
+
+
+class TestLoggingProgress(ProgressTestCase):
+
+    def test_log(self):
+        logger = mock.Mock(spec=logging.Logger)
+        progress = LoggingProgress(interval=10, logger=logger, level=logging.DEBUG)
+        transfer = progress.start('reads.fq', 2000)
+        progress.update(transfer, 1000)
+        progress.update(transfer, 500)
+        progress.finish(transfer)
+
+        self.assertEqual(logger.log.call_count, 2)
+        level, message = logger.log.call_args[0]
+        self.assertEqual(level, logging.DEBUG)
+        self.assertIn('reads.fq', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+from genesis import GenRateLimiter, GenSession
+from genesis import ratelimit
+from genesis.tests.base import mock
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.
+
+    def time(self):
+        return self.now
+
+
+class TestGenRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(ratelimit.time, 'time', self.clock.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_requests(self):
+        limiter = GenRateLimiter(requests_per_second=10, burst=0.5)
+
+        # A full bucket lets a burst of 5 requests through
+        self.assertEqual([limiter.reserve() for _ in range(5)], [0] * 5)
+        self.assertAlmostEqual(limiter.reserve(), 0.1)
+        self.assertAlmostEqual(limiter.reserve(), 0.2)
+
+        # The debt is repaid and the bucket refills, but not beyond its size
+        self.clock.now += 10
+        self.assertEqual([limiter.reserve() for _ in range(5)], [0] * 5)
+        self.assertAlmostEqual(limiter.reserve(), 0.1)
+
+    def test_bytes(self):
+        limiter = GenRateLimiter(bytes_per_second=1000)
+
+        self.assertEqual(limiter.reserve(requests=0, nbytes=1000), 0)
+        # A transfer larger than the bucket is let through, later ones wait
+        self.assertAlmostEqual(limiter.reserve(requests=0, nbytes=3000), 3)
+        self.clock.now += 1
+        self.assertAlmostEqual(limiter.reserve(requests=0, nbytes=500), 2.5)
+
+    def test_both_limits(self):
+        limiter = GenRateLimiter(requests_per_second=1, bytes_per_second=100, burst=1)
+        self.assertEqual(limiter.reserve(nbytes=100), 0)
+        self.assertAlmostEqual(limiter.reserve(nbytes=50), 1)
+        self.assertAlmostEqual(limiter.reserve(requests=0, nbytes=150), 2)
+
+    def test_unlimited(self):
+        limiter = GenRateLimiter(bytes_per_second=10)
+        self.assertEqual([limiter.reserve() for _ in range(100)], [0] * 100)
+
+    def test_acquire_sleeps(self):
+        limiter = GenRateLimiter(requests_per_second=2, burst=0.5)
+        with mock.patch.object(ratelimit.time, 'sleep') as sleep:
+            limiter.acquire()
+            self.assertEqual(limiter.acquire(), 0.5)
+        sleep.assert_called_once_with(0.5)
+
+    def test_invalid(self):
+        for kwargs in ({'requests_per_second': 0}, {'bytes_per_second': -1}, {'burst': 0}):
+            with self.assertRaises(ValueError):
+                GenRateLimiter(**kwargs)
+
+
+@unittest.skipIf(ratelimit.fcntl is None, "State files are not supported")
+class TestSharedGenRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(ratelimit.time, 'time', self.clock.time)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.path = tempfile.mkdtemp()
+        self.state = os.path.join(self.path, 'rate')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_limiters_share_state_file(self):
+        first = GenRateLimiter(requests_per_second=10, burst=0.2, path=self.state)
+        second = GenRateLimiter(requests_per_second=10, burst=0.2, path=self.state)
+
+        self.assertEqual([first.reserve(), second.reserve()], [0, 0])
+        self.assertAlmostEqual(first.reserve(), 0.1)
+        self.assertAlmostEqual(second.reserve(), 0.2)
+        self.assertEqual(os.path.getsize(self.state), ratelimit.STATE_SIZE)
+
+    def test_forked_process_reopens_state_file(self):
+        limiter = GenRateLimiter(requests_per_second=10, path=self.state)
+        limiter.reserve()
+        handle = limiter._file  # pylint: disable=protected-access
+
+        with mock.patch.object(ratelimit.os, 'getpid', return_value=os.getpid() + 1):
+            limiter.reserve()
+        self.assertIsNot(limiter._file, handle)  # pylint: disable=protected-access
+
+
+class FakeAdapter(BaseAdapter):
+
+    def send(self, request, stream=False, **kwargs):  # pylint: disable=arguments-differ
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        response.raw = io.BytesIO(b'x' * 250)
+        return response
+
+    def close(self):
+        pass
+
+
+class NotModifiedAdapter(FakeAdapter):
+
+    def send(self, request, stream=False, **kwargs):  # pylint: disable=arguments-differ
+        response = super(NotModifiedAdapter, self).send(request, stream=stream, **kwargs)
+        response.headers['ETag'] = '"v1"'
+        if request.headers.get('If-None-Match') == '"v1"':
+            response.status_code = 304
+            response.raw = io.BytesIO(b'')
+        return response
+
+
+class TestSessionRateLimit(unittest.TestCase):
+
+    def setUp(self):
+        self.limiter = mock.Mock(spec=GenRateLimiter)
+        self.session = GenSession(rate_limiter=self.limiter)
+        self.session.mount('http://', FakeAdapter())
+
+    def charged(self):
+        return [(c[1].get('requests', 1), c[1].get('nbytes', 0)) for c in self.limiter.acquire.call_args_list]
+
+    def test_request_and_body(self):
+        self.session.post('http://genesis.test/upload/', data=b'y' * 100)
+        self.assertEqual(self.charged(), [(1, 100), (0, 250)])
+
+    def test_streamed_response(self):
+        response = self.session.get('http://genesis.test/data/1/file', stream=True)
+        self.assertEqual(self.charged(), [(1, 0)])
+
+        self.assertEqual(sum(len(chunk) for chunk in response.iter_content(100)), 250)
+        self.assertEqual(self.charged(), [(1, 0), (0, 100), (0, 100), (0, 50)])
+
+    def test_revalidated_response(self):
+        self.session.mount('http://', NotModifiedAdapter())
+        first = self.session.get('http://genesis.test/api/v1/case/')
+        second = self.session.get('http://genesis.test/api/v1/case/')
+
+        self.assertEqual(second.content, first.content)
+        # Only the first reply carried the body
+        self.assertEqual(self.charged(), [(1, 0), (0, 250), (1, 0)])
+
+    def test_streamed_content(self):
+        response = self.session.get('http://genesis.test/data/1/file', stream=True)
+        self.assertEqual(len(response.content), 250)
+        self.assertEqual(sum(nbytes for _, nbytes in self.charged()), 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
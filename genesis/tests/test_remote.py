@@ -0,0 +1,96 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import re
+import unittest
+
+import requests
+
+from genesis import GenRemoteFile
+
+
+CONTENT = bytes(bytearray(range(256))) * 4
+
+
+class FakeSession(object):
+
+    """Serve ``CONTENT`` with or without support for Range requests."""
+
+    def __init__(self, ranges=True):
+        self.ranges = ranges
+        self.requests = []
+
+    def get(self, url, auth=None, headers=None):
+        self.requests.append(headers['Range'])
+        response = requests.Response()
+        start, end = [int(x) for x in re.match(r'bytes=(\d+)-(\d+)', headers['Range']).groups()]
+
+        if not self.ranges:
+            response.status_code = 200
+            response._content = CONTENT  # pylint: disable=protected-access
+        elif start >= len(CONTENT):
+            response.status_code = 416
+            response.headers['Content-Range'] = 'bytes */{}'.format(len(CONTENT))
+            response._content = b''  # pylint: disable=protected-access
+        else:
+            end = min(end, len(CONTENT) - 1)
+            response.status_code = 206
+            response.headers['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, len(CONTENT))
+            response._content = CONTENT[start:end + 1]  # pylint: disable=protected-access
+
+        return response
+
+
+class TestGenRemoteFile(unittest.TestCase):
+
+    def open(self, session, **kwargs):
+        return GenRemoteFile('http://genesis.test/data/1/file', session=session, **kwargs)
+
+    def test_read_ranges(self):
+        session = FakeSession()
+        f = self.open(session, block_size=100, read_ahead=1)
+
+        f.seek(250)
+        self.assertEqual(f.read(10), CONTENT[250:260])
+        self.assertEqual(f.size, len(CONTENT))
+        self.assertEqual(session.requests, ['bytes=200-299'])
+
+        f.seek(-24, io.SEEK_END)
+        self.assertEqual(f.read(), CONTENT[-24:])
+        self.assertEqual(session.requests[-1], 'bytes=1000-1023')
+
+    def test_read_ahead_and_cache(self):
+        session = FakeSession()
+        f = self.open(session, block_size=100, read_ahead=4)
+
+        self.assertEqual(f.read(150), CONTENT[:150])
+        self.assertEqual(session.requests, ['bytes=0-99', 'bytes=100-499'])
+
+        f.seek(0)
+        self.assertEqual(f.read(500), CONTENT[:500])
+        self.assertEqual(len(session.requests), 2)
+
+    def test_read_past_end(self):
+        session = FakeSession()
+        f = self.open(session, block_size=100)
+
+        f.seek(5000)
+        self.assertEqual(f.read(10), b'')
+        self.assertEqual(session.requests, ['bytes=5000-5099'])
+        self.assertEqual(f.size, len(CONTENT))
+
+    def test_whole_file_fallback(self):
+        session = FakeSession(ranges=False)
+        f = self.open(session, block_size=100, read_ahead=1)
+
+        f.seek(300)
+        self.assertEqual(f.read(50), CONTENT[300:350])
+        self.assertEqual(f.size, len(CONTENT))
+        f.seek(0)
+        self.assertEqual(io.BufferedReader(f).read(), CONTENT)
+        # The whole file is downloaded once and later reads are served from it
+        self.assertEqual(len(session.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
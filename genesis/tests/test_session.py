@@ -0,0 +1,135 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+from requests.adapters import BaseAdapter
+
+from genesis import GenSession
+
+
+class FakeAdapter(BaseAdapter):
+
+    """Serve a JSON body with an ETag, reply 304 to matching conditional requests."""
+
+    def __init__(self):
+        super(FakeAdapter, self).__init__()
+        self.etag = '"v1"'
+        self.body = b'{"objects": [1]}'
+        self.requests = []
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        self.requests.append(request)
+        response = requests.Response()
+        response.request = request
+        response.url = request.url
+        response.headers['ETag'] = self.etag
+
+        if request.method == 'GET' and request.headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response._content = b''  # pylint: disable=protected-access
+        else:
+            response.status_code = 200
+            response.headers['Content-Type'] = 'application/json'
+            response._content = self.body  # pylint: disable=protected-access
+        return response
+
+    def close(self):
+        pass
+
+
+class TestGenSession(unittest.TestCase):
+
+    def setUp(self):
+        self.adapter = FakeAdapter()
+        self.session = GenSession()
+        self.session.mount('http://', self.adapter)
+
+    def test_not_modified_is_served_from_cache(self):
+        first = self.session.get('http://genesis.test/api/v1/data/', params={'status': 'done'})
+        second = self.session.get('http://genesis.test/api/v1/data/', params={'status': 'done'})
+
+        self.assertEqual(self.adapter.requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers['ETag'], '"v1"')
+
+    def test_modified_resource_is_replaced(self):
+        self.session.get('http://genesis.test/api/v1/data/')
+        self.adapter.etag = '"v2"'
+        self.adapter.body = b'{"objects": [2]}'
+
+        self.assertEqual(self.session.get('http://genesis.test/api/v1/data/').json(), {'objects': [2]})
+        self.assertEqual(self.session.get('http://genesis.test/api/v1/data/').json(), {'objects': [2]})
+        self.assertEqual(self.adapter.requests[2].headers['If-None-Match'], '"v2"')
+
+    def test_other_requests_are_not_cached(self):
+        self.session.get('http://genesis.test/api/v1/data/', params={'status': 'done'})
+        self.session.get('http://genesis.test/api/v1/data/', params={'status': 'error'})
+        self.session.get('http://genesis.test/data/1/file', stream=True)
+        self.session.get('http://genesis.test/data/1/file', stream=True)
+        self.session.post('http://genesis.test/api/v1/data/', data='{}')
+
+        self.assertTrue(all('If-None-Match' not in r.headers for r in self.adapter.requests))
+
+    def test_cache_size_is_limited(self):
+        session = GenSession(max_entries=1)
+        session.mount('http://', self.adapter)
+        session.get('http://genesis.test/a')
+        session.get('http://genesis.test/b')
+        session.get('http://genesis.test/a')
+
+        self.assertNotIn('If-None-Match', self.adapter.requests[2].headers)
+
+
+class TestStoredResponses(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.adapter = FakeAdapter()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def session(self, **kwargs):
+        session = GenSession(cache_dir=os.path.join(self.path, 'http'), **kwargs)
+        session.mount('http://', self.adapter)
+        return session
+
+    def test_new_session_revalidates_stored_response(self):
+        first = self.session().get('http://genesis.test/api/v1/case/')
+        second = self.session().get('http://genesis.test/api/v1/case/')
+
+        self.assertEqual(self.adapter.requests[1].headers['If-None-Match'], '"v1"')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers['Content-Type'], 'application/json')
+
+    def test_stored_responses_are_limited(self):
+        session = self.session(max_stored=1)
+        session.get('http://genesis.test/a')
+        directory = os.path.join(self.path, 'http')
+        for name in os.listdir(directory):
+            os.utime(os.path.join(directory, name), (0, 0))
+        session.get('http://genesis.test/b')
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+        self.session().get('http://genesis.test/a')
+        self.assertNotIn('If-None-Match', self.adapter.requests[2].headers)
+
+    def test_unreadable_response_is_ignored(self):
+        self.session().get('http://genesis.test/a')
+        directory = os.path.join(self.path, 'http')
+        for name in os.listdir(directory):
+            with open(os.path.join(directory, name), 'wb') as f:
+                f.write(b'garbage')
+
+        self.assertEqual(self.session().get('http://genesis.test/a').json(), {'objects': [1]})
+        self.assertNotIn('If-None-Match', self.adapter.requests[1].headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
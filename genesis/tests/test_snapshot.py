@@ -0,0 +1,86 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from genesis import OfflineGenesis
+from genesis.tests.base import make_genesis, mock, object_id, raw_data
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.snapshot = os.path.join(self.path, 'genesis.snapshot')
+
+        self.project = {'id': object_id(100), 'name': 'Project', 'url_slug': 'project'}
+        other = {'id': object_id(101), 'name': 'Other', 'url_slug': 'other'}
+        data = [
+            raw_data(1),
+            raw_data(2, refs=[object_id(1)], case_ids=[self.project['id']]),
+            raw_data(3, status='error', case_ids=[self.project['id']]),
+            raw_data(4, case_ids=[other['id']]),
+        ]
+        processors = [{'name': 'test:processor', 'input_schema': [], 'output_schema': []}]
+
+        gen = make_genesis(data, [self.project, other], processors)
+        gen.snapshot(self.snapshot, projects=['project'])
+        self.offline = OfflineGenesis(self.snapshot)
+
+    def tearDown(self):
+        self.offline.close()
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        self.assertEqual(list(self.offline.projects()), [self.project['id']])
+        self.assertEqual(self.offline.processors('test:processor')[0]['name'], 'test:processor')
+
+        data = {d.id: d for d in self.offline.project_data('project')}
+        self.assertEqual(sorted(data), [object_id(2), object_id(3)])
+        # Referenced objects outside the project are included and hydrated
+        self.assertEqual(data[object_id(2)].annotation['input.ref0.static.name']['value'], 'data 1')
+
+    def test_other_projects_are_excluded(self):
+        self.assertEqual(self.offline.data(id=object_id(4)), [])
+
+    def test_indexed_query_decodes_matches_only(self):
+        with mock.patch.object(self.offline, '_record', wraps=self.offline._record) as record:
+            found = self.offline.data(status='error')
+            ids = self.offline._query_ids(static__name__startswith='data')  # pylint: disable=protected-access
+
+        self.assertEqual([d.id for d in found], [object_id(3)])
+        self.assertEqual(record.call_count, 1)
+        self.assertEqual(ids, set(object_id(i) for i in (1, 2, 3)))
+
+    def test_find(self):
+        project = self.offline.projects()[self.project['id']]
+        with mock.patch.object(self.offline, '_record', wraps=self.offline._record) as record:
+            found = project.find('status=error&type__startswith=data:')
+
+        self.assertEqual([d.id for d in found], [object_id(3)])
+        # Project data and its reference are decoded, the filter is matched against the index
+        self.assertEqual(record.call_count, 3)
+        self.assertEqual([d.id for d in project.find('static__name=data 2')], [object_id(2)])
+        with self.assertRaises(ValueError):
+            project.find('status')
+
+    def test_query_other_fields(self):
+        found = self.offline.data(input__ref0=object_id(1))
+        self.assertEqual([d.id for d in found], [object_id(2)])
+
+    def test_read_only(self):
+        with self.assertRaises(RuntimeError):
+            self.offline.create({'name': 'data'})
+
+    def test_not_a_snapshot(self):
+        path = os.path.join(self.path, 'other')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 100)
+        with self.assertRaises(ValueError):
+            OfflineGenesis(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import requests
+
+from genesis import GenStore
+from genesis.tests.base import make_genesis, mock, object_id, raw_data
+
+
+def file_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Length'] = str(len(content))
+    response.raw = io.BytesIO(content)
+    return response
+
+
+class TestGenStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_put_get(self):
+        store = GenStore(self.path)
+        self.assertIsNone(store.get('aa-output.exp'))
+
+        path = store.put('aa-output.exp', [b'ab', b'cd'])
+        self.assertEqual(store.get('aa-output.exp'), path)
+        with store.open('aa-output.exp') as f:
+            self.assertEqual(f.read(), b'abcd')
+        self.assertEqual(store.size(), 4)
+
+    def test_evict_least_recently_used(self):
+        store = GenStore(self.path, max_size=10)
+        old = store.put('aa-old', [b'x' * 4])
+        used = store.put('bb-used', [b'x' * 4])
+        os.utime(old, (time.time() - 20, time.time() - 20))
+        os.utime(used, (time.time() - 10, time.time() - 10))
+        store.get('bb-used')
+
+        new = store.put('cc-new', [b'x' * 4])
+
+        self.assertIsNone(store.get('aa-old'))
+        self.assertEqual(store.get('bb-used'), used)
+        self.assertEqual(store.get('cc-new'), new)
+        self.assertEqual(store.size(), 8)
+
+    def test_evict_keeps_new_file(self):
+        store = GenStore(self.path, max_size=2)
+        path = store.put('aa-big', [b'x' * 4])
+        self.assertEqual(store.get('aa-big'), path)
+
+    def test_link(self):
+        store = GenStore(self.path)
+        store.put('aa-output.exp', [b'abcd'])
+        dest = os.path.join(self.path, 'linked.exp')
+
+        self.assertTrue(store.link('aa-output.exp', dest))
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+        self.assertFalse(store.link('missing', os.path.join(self.path, 'missing.exp')))
+
+    def test_link_copies_without_hard_links(self):
+        store = GenStore(self.path)
+        store.put('aa-output.exp', [b'abcd'])
+        dest = os.path.join(self.path, 'copied.exp')
+
+        with mock.patch('os.link', side_effect=OSError):
+            self.assertTrue(store.link('aa-output.exp', dest))
+        with open(dest, 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+
+class TestDownloadStore(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        output = {'exp': {'file': 'expression.tab'}}
+        data = raw_data(1, output=output)
+        data['output_schema'] = [{'name': 'exp', 'type': 'basic:file:', 'label': 'Expression'}]
+        self.gen = make_genesis([data], store=os.path.join(self.path, 'store'))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_download_returns_responses(self):
+        with mock.patch.object(self.gen.session, 'get', return_value=file_response(b'abcd')) as get:
+            first = next(self.gen.download([object_id(1)], 'output.exp'))
+            second = next(self.gen.download([object_id(1)], 'output.exp'))
+
+        self.assertEqual(get.call_count, 1)
+        for response in (first, second):
+            self.assertIsInstance(response, requests.Response)
+            self.assertEqual(response.content, b'abcd')
+
+    def test_download_files_links_stored_files(self):
+        with mock.patch.object(self.gen.session, 'get', return_value=file_response(b'abcd')):
+            paths = self.gen.download_files([object_id(1)], 'output.exp', self.path)
+
+        self.assertEqual(paths, [os.path.join(self.path, 'expression.tab')])
+        with open(paths[0], 'rb') as f:
+            self.assertEqual(f.read(), b'abcd')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import gzip
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from genesis import GenUploadIndex
+from genesis import genesis as genesis_module
+from genesis import uploads
+from genesis.genesis import Genesis
+from genesis.tests.base import make_genesis, mock, object_id, raw_data
+
+
+def gzip_compress(content):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(content)
+    return buf.getvalue()
+
+
+def ok_response(content=b''):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content  # pylint: disable=protected-access
+    return response
+
+
+class TestRechunk(unittest.TestCase):
+
+    def test_rechunk(self):
+        with mock.patch.object(genesis_module, 'CHUNK_SIZE', 4):
+            chunks = list(Genesis._rechunk([b'ab', b'', b'cdefghi', b'j']))  # pylint: disable=protected-access
+        self.assertEqual(chunks, [b'abcd', b'efgh', b'ij'])
+
+    def test_rechunk_empty(self):
+        self.assertEqual(list(Genesis._rechunk([])), [])  # pylint: disable=protected-access
+
+
+class TestUploadChunks(unittest.TestCase):
+
+    def setUp(self):
+        self.gen = make_genesis()
+        self.posts = []
+
+        def post(url, data=None, headers=None, **kwargs):
+            self.posts.append((headers, data))
+            return ok_response()
+
+        patcher = mock.patch.object(self.gen.session, 'post', side_effect=post)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(genesis_module, 'CHUNK_SIZE', 4)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def upload(self, src):
+        return self.gen._upload_file(src)  # pylint: disable=protected-access
+
+    def test_unknown_length(self):
+        self.assertTrue(self.upload(('reads.fq', iter([b'abc', b'defgh', b'ij']))))
+
+        self.assertEqual([h['Content-Range'] for h, _ in self.posts],
+                         ['bytes 0-3/*', 'bytes 4-7/*', 'bytes 8-9/10'])
+        self.assertEqual(b''.join(d for _, d in self.posts), b'abcdefghij')
+        self.assertTrue(all('Content-Length' not in h for h, _ in self.posts))
+        self.assertEqual(len(set(h['Session-Id'] for h, _ in self.posts)), 1)
+
+    def test_unknown_length_full_last_chunk(self):
+        self.upload(('reads.fq', io.BytesIO(b'abcdefgh')))
+        self.assertEqual([h['Content-Range'] for h, _ in self.posts], ['bytes 0-3/*', 'bytes 4-7/8'])
+
+    def test_file_name(self):
+        self.upload(('reads.fq', [b'ab']))
+        self.assertEqual(self.posts[0][0]['Content-Disposition'], 'attachment; filename="reads.fq"')
+
+        with self.assertRaises(ValueError):
+            self.upload(io.BytesIO(b'ab'))
+
+    def test_known_length(self):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = 'http://genesis.test/data/1/reads%20one.fq'
+        response.headers['Content-Length'] = '6'
+        response.raw = io.BytesIO(b'abcdef')
+
+        self.upload(response)
+
+        self.assertEqual([h['Content-Range'] for h, _ in self.posts], ['bytes 0-3/6', 'bytes 4-5/6'])
+        self.assertEqual(self.posts[0][0]['Content-Length'], '6')
+        self.assertEqual(self.posts[0][0]['Content-Disposition'], 'attachment; filename="reads one.fq"')
+
+    def test_encoded_response(self):
+        content = b'abcdef'
+        response = requests.Response()
+        response.status_code = 200
+        response.url = 'http://genesis.test/data/1/reads.fq'
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Content-Length'] = str(len(gzip_compress(content)))
+        response.raw = io.BytesIO(content)
+
+        self.upload(response)
+
+        # The decoded size is not known until the last chunk
+        self.assertEqual([h['Content-Range'] for h, _ in self.posts], ['bytes 0-3/*', 'bytes 4-5/6'])
+        self.assertTrue(all('Content-Length' not in h for h, _ in self.posts))
+
+    def test_failed_chunk_is_retried(self):
+        failed = requests.Response()
+        failed.status_code = 500
+        self.gen.session.post.side_effect = [failed, ok_response(), ok_response()]
+
+        with mock.patch.object(genesis_module, 'logger') as logger:
+            self.assertTrue(self.upload(('reads.fq', [b'abcdef'])))
+        self.assertEqual(self.gen.session.post.call_count, 3)
+        # Reported to the log instead of standard output
+        logger.warning.assert_called_once_with(mock.ANY, 500, 'bytes 0-3/*')
+
+
+class TestLinkData(unittest.TestCase):
+
+    def test_link_data_uses_session(self):
+        gen = make_genesis()
+        with mock.patch.object(gen.session, 'patch', return_value=ok_response()) as patch:
+            gen._link_data({'id': '1', 'case_ids': ['a']}, 'b')  # pylint: disable=protected-access
+
+        self.assertEqual(patch.call_args[0][0], 'http://genesis.test/api/v1/data/1/')
+        self.assertEqual(patch.call_args[1]['data'], '{"case_ids": ["a", "b"]}')
+
+
+class TestGenUploadIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.reads = os.path.join(self.path, 'reads.fq')
+        with open(self.reads, 'wb') as f:
+            f.write(b'ACGT')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_checksum_is_cached_while_file_is_unchanged(self):
+        index = GenUploadIndex(os.path.join(self.path, 'index.json'))
+        with mock.patch.object(uploads, 'file_checksum', wraps=uploads.file_checksum) as checksum:
+            first = index.checksum(self.reads)
+            self.assertEqual(index.checksums([self.reads, self.reads]), [first, first])
+            self.assertEqual(checksum.call_count, 1)
+
+            with open(self.reads, 'ab') as f:
+                f.write(b'ACGT')
+            self.assertNotEqual(index.checksum(self.reads), first)
+            self.assertEqual(checksum.call_count, 2)
+
+    def test_index_is_saved(self):
+        path = os.path.join(self.path, 'index', 'index.json')
+        index = GenUploadIndex(path)
+        index.checksum(self.reads)
+        index.set_upload('key', object_id(1))
+
+        saved = GenUploadIndex(path)
+        self.assertEqual(saved.get_upload('key'), object_id(1))
+        self.assertEqual(saved.files, index.files)
+
+        saved.remove_upload('key')
+        self.assertIsNone(GenUploadIndex(path).get_upload('key'))
+
+    def test_upload_key(self):
+        key = GenUploadIndex.upload_key('import:upload:reads-fastq', {'src': 'a', 'adapters': 'x'})
+        self.assertEqual(key, GenUploadIndex.upload_key('import:upload:reads-fastq', {'adapters': 'x', 'src': 'a'}))
+        self.assertNotEqual(key, GenUploadIndex.upload_key('import:upload:reads-fastq', {'src': 'b', 'adapters': 'x'}))
+
+
+class TestUploadDeduplication(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.reads = os.path.join(self.path, 'reads.fq')
+        with open(self.reads, 'wb') as f:
+            f.write(b'ACGT')
+
+        self.uploaded = raw_data(1, case_ids=[object_id(100)])
+        processors = [{'name': 'import:upload:reads-fastq',
+                       'input_schema': [{'name': 'src', 'type': 'basic:file:', 'label': 'Reads'}]}]
+        self.gen = make_genesis([self.uploaded], processors=processors,
+                                upload_index=os.path.join(self.path, 'index.json'))
+
+        created = ok_response('{{"id": "{}"}}'.format(object_id(1)).encode('utf-8'))
+        for method, response in (('post', created), ('patch', ok_response())):
+            patcher = mock.patch.object(self.gen.session, method, return_value=response)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def upload(self, project):
+        return self.gen.upload(project, 'import:upload:reads-fastq', src=self.reads)
+
+    def test_repeated_upload_links_data(self):
+        self.upload(object_id(100))
+        # One chunk and the data object
+        self.assertEqual(self.gen.session.post.call_count, 2)
+
+        self.upload(object_id(101))
+        self.assertEqual(self.gen.session.post.call_count, 2)
+        args, kwargs = self.gen.session.patch.call_args
+        self.assertEqual(args[0], 'http://genesis.test/api/v1/data/{}/'.format(object_id(1)))
+        self.assertEqual(kwargs['data'],
+                         '{{"case_ids": ["{}", "{}"]}}'.format(object_id(100), object_id(101)))
+
+    def test_failed_upload_is_repeated(self):
+        self.upload(object_id(100))
+        self.uploaded['status'] = 'error'
+
+        self.upload(object_id(100))
+        self.assertEqual(self.gen.session.post.call_count, 4)
+        self.assertFalse(self.gen.session.patch.called)
+
+    def test_changed_file_is_uploaded(self):
+        self.upload(object_id(100))
+        with open(self.reads, 'ab') as f:
+            f.write(b'ACGT')
+
+        self.upload(object_id(100))
+        self.assertEqual(self.gen.session.post.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import threading
+import time
+import unittest
+
+from genesis.utils import SingleFlight, match_query
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def load(key):
+            calls.append(key)
+            started.set()
+            release.wait(5)
+            return [key]
+
+        leader = threading.Thread(target=lambda: results.append(flight.do('a', load, 'a')))
+        leader.start()
+        started.wait(5)
+
+        followers = [threading.Thread(target=lambda: results.append(flight.do('a', load, 'a'))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        # Let the followers reach the in-flight call
+        time.sleep(0.1)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(result is results[0] for result in results))
+
+    def test_sequential_calls_are_repeated(self):
+        flight = SingleFlight()
+        calls = []
+        flight.do('a', calls.append, 1)
+        flight.do('a', calls.append, 2)
+        flight.do('b', calls.append, 3)
+        self.assertEqual(calls, [1, 2, 3])
+
+    def test_error_is_shared(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def fail():
+            started.set()
+            release.wait(5)
+            raise ValueError("failed")
+
+        def call():
+            try:
+                flight.do('a', fail)
+            except ValueError as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        started.wait(5)
+        threads.append(threading.Thread(target=call))
+        threads[1].start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
+
+        # A failed call is not remembered
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+
+    def test_many_keys_in_flight_are_not_repeated(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = {}
+
+        def load(keys):
+            calls.append(keys)
+            if len(calls) == 1:
+                started.set()
+                release.wait(5)
+            # Key 'x' has no result
+            return {key: key.upper() for key in keys if key != 'x'}
+
+        leader = threading.Thread(target=lambda: results.update(leader=flight.do_many(['a', 'b', 'x'], load)))
+        leader.start()
+        started.wait(5)
+
+        follower = threading.Thread(target=lambda: results.update(follower=flight.do_many(['b', 'c', 'x'], load)))
+        follower.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in (leader, follower):
+            thread.join(5)
+
+        self.assertEqual(calls, [['a', 'b', 'x'], ['c']])
+        self.assertEqual(results['leader'], {'a': 'A', 'b': 'B'})
+        self.assertEqual(results['follower'], {'b': 'B', 'c': 'C'})
+        self.assertEqual(flight.do_many(['a', 'a'], load), {'a': 'A'})
+        self.assertEqual(calls[-1], ['a'])
+
+
+class TestMatchQuery(unittest.TestCase):
+
+    obj = {
+        'id': '1',
+        'status': 'done',
+        'type': 'data:reads:fastq:',
+        'case_ids': ['a', 'b'],
+        'static': {'name': 'Reads', 'size': 10},
+    }
+
+    def test_lookups(self):
+        self.assertTrue(match_query(self.obj, {}))
+        self.assertTrue(match_query(self.obj, {'status': 'done', 'limit': 10, 'fields': 'id'}))
+        self.assertFalse(match_query(self.obj, {'status': 'error'}))
+        self.assertTrue(match_query(self.obj, {'type__startswith': 'data:reads:'}))
+        self.assertTrue(match_query(self.obj, {'case_ids__contains': 'b'}))
+        self.assertFalse(match_query(self.obj, {'case_ids__contains': 'c'}))
+        self.assertTrue(match_query(self.obj, {'id__in': '3,1'}))
+        self.assertTrue(match_query(self.obj, {'static__name__iexact': 'reads'}))
+        self.assertTrue(match_query(self.obj, {'static__size__gte': 10}))
+        self.assertFalse(match_query(self.obj, {'static__size__gt': 10}))
+
+    def test_missing_and_incomparable_fields(self):
+        self.assertFalse(match_query(self.obj, {'output__exp': 'x'}))
+        self.assertFalse(match_query(self.obj, {'static__name__gt': 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
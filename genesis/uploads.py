@@ -0,0 +1,142 @@
+"""Upload index"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from multiprocessing.pool import ThreadPool
+
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_checksum(fn):
+    """Return SHA-256 hex digest of a file.
+
+    :param fn: File path
+    :type fn: string
+    :rtype: string
+
+    """
+    digest = hashlib.sha256()
+    with open(fn, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+class GenUploadIndex(object):
+
+    """Local index of uploaded files used to skip repeated uploads.
+
+    The index maps file paths to checksums (valid while file size and
+    modification time do not change) and upload keys, built from the
+    processor name and input checksums, to uploaded data object ids. It is
+    stored as JSON in ``path``.
+
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.files = {}
+        self.uploads = {}
+        self._lock = threading.Lock()
+
+        if os.path.isfile(self.path):
+            with open(self.path) as f:
+                index = json.load(f)
+
+            self.files = index.get('files', {})
+            self.uploads = index.get('uploads', {})
+
+    def checksum(self, fn):
+        """Return checksum of a file, hashing it only if it changed.
+
+        :param fn: File path
+        :type fn: string
+        :rtype: string
+
+        """
+        fn = os.path.abspath(fn)
+        stat = os.stat(fn)
+
+        with self._lock:
+            cached = self.files.get(fn)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            return cached[2]
+
+        checksum = file_checksum(fn)
+        with self._lock:
+            self.files[fn] = [stat.st_size, stat.st_mtime, checksum]
+
+        return checksum
+
+    def checksums(self, fns, threads=4):
+        """Return checksums of files, hashing changed files in parallel.
+
+        :param fns: File paths
+        :type fns: list of strings
+        :param threads: Number of hashing threads
+        :type threads: int
+        :rtype: list of strings
+
+        """
+        if len(fns) < 2:
+            return [self.checksum(fn) for fn in fns]
+
+        pool = ThreadPool(min(threads, len(fns)))
+        try:
+            return pool.map(self.checksum, fns)
+        finally:
+            pool.close()
+
+    @staticmethod
+    def upload_key(processor_name, inputs):
+        """Return the key of an upload.
+
+        :param processor_name: Processor object name
+        :type processor_name: string
+        :param inputs: Input values with files replaced by checksums
+        :type inputs: dict
+        :rtype: string
+
+        """
+        key = json.dumps({'processor_name': processor_name, 'input': inputs}, sort_keys=True)
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def get_upload(self, key):
+        """Return data object id of an upload or ``None``."""
+        with self._lock:
+            return self.uploads.get(key)
+
+    def set_upload(self, key, data_id):
+        """Record data object id of an upload and save the index."""
+        with self._lock:
+            self.uploads[key] = data_id
+        self.save()
+
+    def remove_upload(self, key):
+        """Forget an upload and save the index."""
+        with self._lock:
+            self.uploads.pop(key, None)
+        self.save()
+
+    def save(self):
+        """Write the index to disk."""
+        with self._lock:
+            index = json.dumps({'files': self.files, 'uploads': self.uploads})
+
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(index)
+        os.rename(tmp_path, self.path)
@@ -1,4 +1,5 @@
 """Utils"""
+import threading
 
 
 def iterate_fields(fields, schema):
@@ -56,3 +57,153 @@ def iterate_schema(fields, schema, path=None):
                 yield (field_schema, fields)
             else:
                 yield (field_schema, fields, '{}.{}'.format(path, name))
+
+
+class SingleFlight(object):
+
+    """Coalesce concurrent calls with the same key into a single call.
+
+    While a call for a key is in flight, other threads calling with the same
+    key wait for it and receive its result (or exception).
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args, **kwargs):
+        """Call ``func`` unless a call with the same key is in flight.
+
+        :param key: Call key
+        :type key: hashable
+        :param func: Function to call
+        :type func: callable
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {'event': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['event'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = func(*args, **kwargs)
+        except BaseException as ex:
+            call['error'] = ex
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['event'].set()
+
+        return call['result']
+
+    def do_many(self, keys, func):
+        """Call ``func`` with keys that are not in flight and wait for the others.
+
+        Keys already in flight in another :meth:`do_many` call are not passed
+        to ``func``, their results are taken from that call. Keys of
+        :meth:`do_many` must not be used with :meth:`do`.
+
+        :param keys: Call keys
+        :type keys: list of hashables
+        :param func: Function that returns a dict of results by key, keys
+            without a result are left out
+        :type func: callable
+        :rtype: dict of results by key
+
+        """
+        leading = []
+        waiting = {}
+        call = {'event': threading.Event(), 'result': {}, 'error': None}
+        with self._lock:
+            for key in keys:
+                if key in self._calls:
+                    waiting[key] = self._calls[key]
+                elif key not in leading:
+                    leading.append(key)
+                    self._calls[key] = call
+
+        results = {}
+        if leading:
+            try:
+                call['result'] = func(leading)
+            except BaseException as ex:
+                call['error'] = ex
+                raise
+            finally:
+                with self._lock:
+                    for key in leading:
+                        del self._calls[key]
+                call['event'].set()
+
+            results.update((key, call['result'][key]) for key in leading if key in call['result'])
+
+        for key, other in waiting.items():
+            other['event'].wait()
+            if other['error'] is not None:
+                raise other['error']
+            if key in other['result']:
+                results[key] = other['result'][key]
+
+        return results
+
+
+QUERY_LOOKUPS = {
+    'exact': lambda value, arg: value == arg,
+    'iexact': lambda value, arg: '{}'.format(value).lower() == '{}'.format(arg).lower(),
+    'contains': lambda value, arg: arg in value if isinstance(value, list) else '{}'.format(arg) in '{}'.format(value),
+    'icontains': lambda value, arg: '{}'.format(arg).lower() in '{}'.format(value).lower(),
+    'startswith': lambda value, arg: '{}'.format(value).startswith('{}'.format(arg)),
+    'istartswith': lambda value, arg: '{}'.format(value).lower().startswith('{}'.format(arg).lower()),
+    'endswith': lambda value, arg: '{}'.format(value).endswith('{}'.format(arg)),
+    'in': lambda value, arg: value in (arg.split(',') if hasattr(arg, 'split') else arg),
+    'gt': lambda value, arg: value > arg,
+    'gte': lambda value, arg: value >= arg,
+    'lt': lambda value, arg: value < arg,
+    'lte': lambda value, arg: value <= arg,
+}
+
+QUERY_IGNORED = ('limit', 'offset', 'order_by', 'format', 'fields')
+
+
+def match_query(obj, query):
+    """Check if a raw object matches an API query.
+
+    Supports the field lookups of API filters (e.g. ``type__startswith``);
+    nested keys are separated by ``__`` (e.g. ``static__name``).
+
+    :param obj: Raw object (e.g. data object)
+    :type obj: dict
+    :param query: Query filters
+    :type query: dict
+    :rtype: bool
+
+    """
+    for key, arg in query.items():
+        if key in QUERY_IGNORED:
+            continue
+
+        parts = key.split('__')
+        lookup = parts.pop() if len(parts) > 1 and parts[-1] in QUERY_LOOKUPS else 'exact'
+
+        value = obj
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                return False
+            value = value[part]
+
+        try:
+            if not QUERY_LOOKUPS[lookup](value, arg):
+                return False
+        except TypeError:
+            return False
+
+    return True
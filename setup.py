@@ -42,6 +42,11 @@ if __name__ == '__main__':
         ],
         include_package_data=True,
         zip_safe=False,
+        entry_points={
+            'console_scripts': [
+                'genesis = genesis.cli:main',
+            ],
+        },
         install_requires=(
             "requests>=2.6.0",
             "slumber>=0.7.1",
@@ -50,6 +55,9 @@ if __name__ == '__main__':
             'docs':  [
                 'sphinx>=1.7.0',
             ],
+            'parquet': [
+                'pyarrow',
+            ],
         },
         test_suite='genesis.tests'
     )